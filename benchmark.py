@@ -0,0 +1,206 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, date
+
+RESULTS_DIR = "benchmark_results"
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(name, operation, repeat, results):
+    """Time operation(i) repeat times, then run it once more under tracemalloc for peak memory.
+
+    Memory is traced in a separate call because tracing slows the timed calls down.
+    """
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):  # Keep the operations' status prints out of the report
+        start = time.perf_counter()
+        for i in range(repeat):
+            t0 = time.perf_counter()
+            operation(i)
+            latencies.append(time.perf_counter() - t0)
+        total = time.perf_counter() - start
+
+        tracemalloc.start()
+        operation(repeat)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    latencies.sort()
+    results[name] = {
+        "count": repeat,
+        "total_s": total,
+        "ops_per_s": repeat / total if total else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+        "peak_kb": peak / 1024,
+    }
+    print(f"{name:<16} {repeat:>6} ops  {results[name]['ops_per_s']:>10.1f}/s  p50 {results[name]['p50_ms']:>9.3f} ms"
+          f"  p95 {results[name]['p95_ms']:>9.3f} ms  p99 {results[name]['p99_ms']:>9.3f} ms"
+          f"  peak {results[name]['peak_kb']:>10.0f} KB")
+
+
+def run(data_dir, repeat=200, seed=0):
+    """Benchmark every user-facing operation against a scratch copy of data_dir; returns the results dict."""
+    from hospital_database import HospitalDatabase
+    from user_auth import UserAuth
+    from user_tracker import UserActionTracker, ActionLogView
+    from graph_utils import GraphGenerator
+
+    rng = random.Random(seed)
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="hospital_bench_")
+    old_cwd = os.getcwd()
+    try:
+        scratch = os.path.join(workdir, "data")
+        shutil.copytree(data_dir, scratch)
+        os.chdir(workdir)  # Charts and the audit log are written relative to the working directory
+        visits_path = os.path.join(scratch, "Patient_data.csv")
+        notes_path = os.path.join(scratch, "Notes.csv")
+
+        measure("load", lambda i: HospitalDatabase(visits_path, notes_file=notes_path), max(1, repeat // 50), results)
+        db = HospitalDatabase(visits_path, notes_file=notes_path)
+
+        auth = UserAuth(os.path.join(scratch, "Credentials.csv"))
+        users = auth.load_credentials()
+        measure("login", lambda i: auth.start_session(users[i % len(users)]["username"],
+                                                      users[i % len(users)]["password"]), repeat, results)
+
+        patient_ids = list(db.patient_index)
+        # The path RetrievePatient takes: the last entry of the patient's timeline
+        measure("retrieve", lambda i: db.get_latest_visit(rng.choice(patient_ids)), repeat, results)
+
+        visit_ids = list(db.visit_index)
+
+        def view_notes(i):
+            for note in db.get_notes_for_visit(rng.choice(visit_ids)):
+                db.get_note_text(note)
+        measure("view_notes", view_notes, repeat, results)
+
+        measure("search_notes", lambda i: db.search_notes("chest pain"), repeat, results)
+
+        days = [date(rng.randint(2000, 2024), rng.randint(1, 12), rng.randint(1, 28)) for _ in range(repeat + 1)]
+        db.refresh()
+        engine = db.get_query_engine()  # Built once, as the Count Visits dialog does before opening
+        measure("count_visits", lambda i: db.count_visits(days[i], days[i]), repeat, results)
+
+        departments = engine.departments() or [None]
+        ranges = [sorted(rng.sample(days, 2)) + [rng.choice(departments + [None])] for _ in range(repeat + 1)]
+        measure("count_visits_range", lambda i: db.count_visits(*ranges[i]), repeat, results)
+
+        template = dict(db.data[0])
+        today = date.today()  # Written as M/D/YYYY, like PatientAdd and the data files
+
+        def add_visit(i):
+            visit_id, = db.allocate_ids("Visit_ID")
+            note_id, = db.allocate_ids("Note_ID")
+            visit = dict(template, Visit_ID=visit_id, Note_ID=note_id, Visit_time=f"{today.month}/{today.day}/{today.year}")
+            note = {"": "", "Patient_ID": visit["Patient_ID"], "Visit_ID": visit_id, "Note_ID": note_id,
+                    "Note_text": "Benchmark visit note."}
+            db.add_visit_record(visit, note)
+        measure("add_visit", add_visit, repeat, results)
+
+        removable = rng.sample(patient_ids, min(len(patient_ids), max(1, repeat // 10) + 1))
+        measure("remove_patient", lambda i: db.remove_patient(removable[i]), len(removable) - 1, results)
+
+        def graphs(i):
+            for name in os.listdir(workdir):
+                if name.startswith("Hospital Statistics"):
+                    shutil.rmtree(os.path.join(workdir, name))  # Time a full render, not the cache
+            GraphGenerator(db.get_aggregates()).render_all()
+        measure("graphs", graphs, max(1, repeat // 100), results)
+
+        tracker = UserActionTracker(None)
+
+        def audit_log(i):
+            for _ in range(100):
+                tracker.track_action("bench", "nurse", "Retrieve Patient")
+            tracker.flush()
+            ActionLogView(tracker.log_file).query(action="retrieve", sort_column="Timestamp", descending=True)
+        measure("audit_log", audit_log, max(1, repeat // 20), results)
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def save_results(results, data_dir, out_dir=RESULTS_DIR):
+    """Store results with enough context (revision, scale, machine) to compare runs later."""
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(data_dir, "Patient_data.csv"), "rb") as f:
+        visits = max(0, sum(1 for _ in f) - 1)
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "data_dir": os.path.abspath(data_dir),
+        "visit_lines": visits,
+        "results": results,
+    }
+    path = os.path.join(out_dir, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+    print(f"Results saved to '{path}'.")
+    return path
+
+
+def compare(baseline_path, results):
+    """Print the p50/p95 change of each operation relative to a saved baseline run."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    print(f"\n{'operation':<16} {'p50 before':>12} {'p50 now':>12} {'p95 before':>12} {'p95 now':>12}")
+    for name, now in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        flag = "  <-- slower" if now["p95_ms"] > before["p95_ms"] * 1.2 else ""
+        print(f"{name:<16} {before['p50_ms']:>12.3f} {now['p50_ms']:>12.3f} "
+              f"{before['p95_ms']:>12.3f} {now['p95_ms']:>12.3f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every user-facing operation on a dataset (headless).")
+    parser.add_argument("data_dir", nargs="?", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"),
+                        help="Folder with Patient_data.csv, Notes.csv and Credentials.csv (left unmodified)")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed calls per operation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", help="A saved results JSON to compare against")
+    parser.add_argument("--out-dir", default=RESULTS_DIR, help="Where to save the results JSON")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    results = run(args.data_dir, args.repeat, args.seed)
+    save_results(results, args.data_dir, args.out_dir)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
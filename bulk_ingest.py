@@ -0,0 +1,117 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+import data_cache
+from sqlite_storage import DEFAULT_DB_NAME
+
+PROGRESS_EVERY = 5000
+VISIT_FIELDS = ["Patient_ID", "Visit_time", "Visit_department", "Race", "Gender", "Ethnicity",
+                "Age", "Zip_code", "Insurance", "Chief_complaint", "Note_type"]
+
+
+def read_records(path):
+    """Stream (line number, record dict) from a CSV or JSONL feed."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith((".jsonl", ".json")):
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield line_no, json.loads(line)
+                    except ValueError:
+                        yield line_no, None
+        else:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+
+
+def normalize_date(value):
+    """Accept YYYY-MM-DD or M/D/YYYY and return the M/D/YYYY form used in Patient_data.csv."""
+    for fmt in ("%Y-%m-%d", "%m/%d/%Y"):
+        try:
+            dt = datetime.strptime(value, fmt)
+            return f"{dt.month}/{dt.day}/{dt.year}"
+        except ValueError:
+            pass
+    return None
+
+
+def validate(record):
+    """Return (cleaned record, None) or (None, reason)."""
+    if not isinstance(record, dict):
+        return None, "not a JSON object"
+    cleaned = {field: str(record.get(field, "") or "").strip() for field in VISIT_FIELDS}
+    cleaned["Note_text"] = str(record.get("Note_text", "") or "").strip()
+
+    if not cleaned["Patient_ID"].isdigit():
+        return None, "Patient_ID must be numeric"
+    visit_time = normalize_date(cleaned["Visit_time"])
+    if not visit_time:
+        return None, "Visit_time must be YYYY-MM-DD or M/D/YYYY"
+    cleaned["Visit_time"] = visit_time
+    if not cleaned["Visit_department"]:
+        return None, "Visit_department is required"
+    if cleaned["Age"] and not cleaned["Age"].isdigit():
+        return None, "Age must be a whole number"
+    return cleaned, None
+
+
+def ingest(input_path, db, rejects_path):
+    """Validate a feed, assign IDs and commit all accepted visits and notes in one write."""
+    accepted = []
+    rejected = 0
+    with open(rejects_path, "w", newline="", encoding="utf-8") as rejects_file:
+        rejects = csv.writer(rejects_file)
+        rejects.writerow(["Line", "Reason", "Record"])
+        for count, (line_no, record) in enumerate(read_records(input_path), 1):
+            cleaned, reason = validate(record)
+            if reason:
+                rejects.writerow([line_no, reason, json.dumps(record)])
+                rejected += 1
+            else:
+                accepted.append(cleaned)
+            if count % PROGRESS_EVERY == 0:
+                print(f"Validated {count} records ({rejected} rejected)...", file=sys.stderr)
+
+    # One block reservation per ID kind covers the whole feed
+    visit_ids = db.allocate_ids("Visit_ID", len(accepted))
+    note_ids = db.allocate_ids("Note_ID", len(accepted))
+
+    visits = []
+    notes = []
+    next_index = len(db.notes) + 1
+    for offset, (record, visit_id, note_id) in enumerate(zip(accepted, visit_ids, note_ids)):
+        note_text = record.pop("Note_text")
+        visit = {"Visit_ID": visit_id, "Note_ID": note_id, **record}
+        visits.append(visit)
+        notes.append({
+            "": str(next_index + offset),  # Index column
+            "Patient_ID": visit["Patient_ID"],
+            "Visit_ID": visit_id,
+            "Note_ID": note_id,
+            "Note_text": note_text,
+        })
+
+    print(f"Committing {len(visits)} visits and notes...", file=sys.stderr)
+    db.add_records(visits, notes)
+    return len(visits), rejected
+
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    arg_parser = argparse.ArgumentParser(description="Bulk-load visits and notes from a CSV or JSONL feed.")
+    arg_parser.add_argument("input", help="CSV or .jsonl file with visit fields and Note_text")
+    arg_parser.add_argument("--data-dir", default=os.path.join(base_dir, "data"))
+    arg_parser.add_argument("--rejects", help="Where to write rejected rows (default: <input>.rejects.csv)")
+    args = arg_parser.parse_args()
+
+    database = data_cache.get_database(
+        os.path.join(args.data_dir, "Patient_data.csv"),
+        os.path.join(args.data_dir, "Notes.csv"),
+        os.path.join(args.data_dir, DEFAULT_DB_NAME),
+    )
+    loaded, rejected_count = ingest(args.input, database, args.rejects or args.input + ".rejects.csv")
+    print(f"Loaded {loaded} visits; {rejected_count} rejected.")
\ No newline at end of file
@@ -0,0 +1,271 @@
+import re
+import time
+from array import array
+
+COHORT_COLUMNS = ("Race", "Gender", "Ethnicity", "Insurance", "Zip_code", "Visit_department", "Chief_complaint")
+SPARSE_RATIO = 32  # Values on fewer than 1/32 of the rows are kept as row lists (smaller than a bitmap)
+
+TOKEN = re.compile(r'\s*(?:(\()|(\))|\b(AND|OR|NOT)\b|([A-Za-z_]+)\s*=\s*("[^"]*"|[^\s()]+))', re.IGNORECASE)
+
+
+def popcount(bitmap):
+    return bitmap.bit_count() if hasattr(bitmap, "bit_count") else bin(bitmap).count("1")
+
+
+def rows_to_bitmap(rows, size):
+    """Python int with bit r set for every row number r."""
+    import numpy as np
+
+    bits = np.zeros(size, dtype=bool)
+    bits[np.asarray(rows, dtype=np.int64)] = True
+    return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+
+def parse_query(text):
+    """Parse 'Column=value AND (Column=value OR NOT Column="two words")' into a nested tuple tree.
+
+    NOT binds tighter than AND, which binds tighter than OR; raises ValueError on bad syntax.
+    """
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Cannot read the query at: '{text[position:position + 20]}'")
+        position = match.end()
+        open_paren, close_paren, keyword, column, value = match.groups()
+        if open_paren:
+            tokens.append(("(",))
+        elif close_paren:
+            tokens.append((")",))
+        elif keyword:
+            tokens.append((keyword.upper(),))
+        else:
+            tokens.append(("term", column, value.strip('"')))
+    if not tokens:
+        raise ValueError("The query is empty.")
+
+    def parse_or(i):
+        node, i = parse_and(i)
+        while i < len(tokens) and tokens[i][0] == "OR":
+            right, i = parse_and(i + 1)
+            node = ("or", node, right)
+        return node, i
+
+    def parse_and(i):
+        node, i = parse_not(i)
+        while i < len(tokens) and tokens[i][0] == "AND":
+            right, i = parse_not(i + 1)
+            node = ("and", node, right)
+        return node, i
+
+    def parse_not(i):
+        if i < len(tokens) and tokens[i][0] == "NOT":
+            node, i = parse_not(i + 1)
+            return ("not", node), i
+        return parse_atom(i)
+
+    def parse_atom(i):
+        if i >= len(tokens):
+            raise ValueError("The query ends too early.")
+        if tokens[i][0] == "(":
+            node, i = parse_or(i + 1)
+            if i >= len(tokens) or tokens[i][0] != ")":
+                raise ValueError("Missing closing parenthesis.")
+            return node, i + 1
+        if tokens[i][0] == "term":
+            return tokens[i], i + 1
+        raise ValueError(f"Unexpected '{tokens[i][0]}' in the query.")
+
+    tree, end = parse_or(0)
+    if end != len(tokens):
+        raise ValueError(f"Unexpected '{tokens[end][0]}' in the query.")
+    return tree
+
+
+class CohortIndex:
+    """Bitmap indexes over the low-cardinality visit columns for AND/OR/NOT cohort counts.
+
+    Every visit gets a row number. For each column value the index keeps the
+    rows holding it either as a Python int used as a bitset (frequent values)
+    or, for rare values like most zip codes, as a compact array of row numbers
+    turned into a bitset only when queried. Combining bitsets with & | ~ and
+    counting bits runs in C over n/8 bytes, so counts take milliseconds even
+    for millions of visits. Removed visits are cleared from the `live` bitset;
+    added visits are buffered and folded in before the next query.
+    """
+
+    def __init__(self, visits=()):
+        import numpy as np
+        from visit_analytics import encode_categorical
+
+        visits = list(visits)
+        self.size = len(visits)
+        self.visits = visits          # row number -> visit (None once removed)
+        self.rows = {id(visit): row for row, visit in enumerate(visits)}
+        self.live = (1 << self.size) - 1
+        self.labels = {column: {} for column in COHORT_COLUMNS}  # column -> folded value -> value as stored
+        self.dense = {}    # (column, folded value) -> int bitset
+        self.sparse = {}   # (column, folded value) -> array of row numbers
+        self.pending_add = []
+        self.pending_remove = []
+
+        for column in COHORT_COLUMNS:
+            labels, codes = encode_categorical([str(visit.get(column, "")).strip() for visit in visits])
+            if not labels:
+                continue
+            # Group row numbers by value in one sort instead of one scan per value
+            order = np.argsort(codes, kind="stable")
+            bounds = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(labels)))))
+            for code, label in enumerate(labels):
+                rows = order[bounds[code]:bounds[code + 1]]
+                self._store(column, label, rows)
+
+    def _store(self, column, label, rows):
+        """Add rows to a value's bitmap, or to its row list while the value stays rare."""
+        key = (column, label.casefold())
+        self.labels[column].setdefault(key[1], label)
+        sparse = self.sparse.get(key)
+        total = len(rows) + (len(sparse) if sparse is not None else 0)
+        if key in self.dense or total * SPARSE_RATIO >= self.size:
+            bitmap = rows_to_bitmap(rows, self.size)
+            if sparse is not None:
+                bitmap |= rows_to_bitmap(self.sparse.pop(key), self.size)  # Promoted: keep its earlier rows
+            self.dense[key] = self.dense.get(key, 0) | bitmap
+        else:
+            self.sparse.setdefault(key, array("L")).extend(int(row) for row in rows)
+
+    def add(self, visit):
+        row = self.size
+        self.size += 1
+        self.visits.append(visit)
+        self.rows[id(visit)] = row
+        self.pending_add.append(row)
+
+    def remove(self, visit):
+        row = self.rows.pop(id(visit), None)
+        if row is not None:
+            self.visits[row] = None
+            self.pending_remove.append(row)
+
+    def _flush(self):
+        """Fold buffered adds and removals into the bitsets (one pass per touched value)."""
+        if self.pending_add:
+            groups = {}
+            for row in self.pending_add:
+                visit = self.visits[row]
+                for column in COHORT_COLUMNS:
+                    label = str(visit.get(column, "")).strip() if visit is not None else None
+                    if label is not None:
+                        groups.setdefault((column, label), []).append(row)
+            for (column, label), rows in groups.items():
+                self._store(column, label, rows)
+            self.live |= rows_to_bitmap(self.pending_add, self.size)
+            self.pending_add = []
+        if self.pending_remove:
+            self.live &= ~rows_to_bitmap(self.pending_remove, self.size)
+            self.pending_remove = []
+
+    def column_for(self, name):
+        for column in COHORT_COLUMNS:
+            if column.casefold() == name.casefold():
+                return column
+        raise ValueError(f"Unknown column '{name}'. Use one of: {', '.join(COHORT_COLUMNS)}")
+
+    def values(self, column):
+        """Distinct values of a column, as stored."""
+        self._flush()
+        return sorted(self.labels[self.column_for(column)].values())
+
+    def bitmap(self, column, value):
+        """Rows (as an int bitset) whose column equals value, case-insensitively."""
+        key = (self.column_for(column), value.strip().casefold())
+        if key in self.dense:
+            return self.dense[key]
+        if key in self.sparse:
+            return rows_to_bitmap(self.sparse[key], self.size)
+        return 0
+
+    def _evaluate(self, node):
+        kind = node[0]
+        if kind == "term":
+            return self.bitmap(node[1], node[2])
+        if kind == "not":
+            return self.live & ~self._evaluate(node[1])
+        left, right = self._evaluate(node[1]), self._evaluate(node[2])
+        return left & right if kind == "and" else left | right
+
+    def select(self, query):
+        """Bitset of the live rows matching a query string (see parse_query)."""
+        tree = parse_query(query) if isinstance(query, str) else query
+        self._flush()
+        return self._evaluate(tree) & self.live
+
+    def count(self, query):
+        return popcount(self.select(query))
+
+    def find(self, query):
+        """The matching visits, in row order."""
+        bitmap = self.select(query)
+        visits = []
+        while bitmap:
+            low = bitmap & -bitmap
+            visits.append(self.visits[low.bit_length() - 1])
+            bitmap ^= low
+        return visits
+
+
+def display_cohort_dialog(root, db):
+    """Management dialog: type or build a cohort query and count the matching visits."""
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+
+    index = db.get_cohort_index()
+    top = tk.Toplevel(root)
+    top.title("Cohort Counts")
+
+    ttk.Label(top, text="Query:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    query_entry = ttk.Entry(top, width=60)
+    query_entry.grid(row=0, column=1, columnspan=3, padx=5, pady=5)
+    query_entry.focus()
+
+    # Column / value picker that appends a condition to the query
+    column_box = ttk.Combobox(top, values=list(COHORT_COLUMNS), state="readonly", width=18)
+    value_box = ttk.Combobox(top, width=28)
+    column_box.grid(row=1, column=1, padx=5, pady=5, sticky="w")
+    value_box.grid(row=1, column=2, padx=5, pady=5, sticky="w")
+    column_box.bind("<<ComboboxSelected>>", lambda event: value_box.configure(values=index.values(column_box.get())))
+
+    def append(operator):
+        if not column_box.get() or not value_box.get():
+            return
+        condition = f'{column_box.get()}="{value_box.get()}"'
+        current = query_entry.get().strip()
+        query_entry.delete(0, tk.END)
+        query_entry.insert(0, f"{current} {operator} {condition}" if current else condition)
+
+    picker = ttk.Frame(top)
+    picker.grid(row=1, column=3, padx=5, pady=5, sticky="w")
+    for operator in ("AND", "OR", "AND NOT"):
+        ttk.Button(picker, text=operator, width=8, command=lambda op=operator: append(op)).pack(side="left")
+
+    ttk.Label(top, foreground="gray",
+              text='Example: Ethnicity=Hispanic AND Insurance=Medicaid AND Visit_department="Emergency department"'
+              ).grid(row=2, column=0, columnspan=4, padx=5)
+
+    result = ttk.Label(top, text="")
+    result.grid(row=4, column=0, columnspan=4, pady=(0, 10))
+
+    def run():
+        start = time.perf_counter()
+        try:
+            count = db.count_cohort(query_entry.get())
+        except ValueError as e:
+            messagebox.showerror("Invalid Query", str(e), parent=top)
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        result.config(text=f"{count} of {len(db.data)} visits match ({elapsed:.1f} ms)")
+
+    ttk.Button(top, text="Count", command=run).grid(row=3, column=0, columnspan=4, pady=5)
+    query_entry.bind("<Return>", lambda event: run())
\ No newline at end of file
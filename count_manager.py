@@ -1,49 +1,89 @@
-
-from tkinter import simpledialog, messagebox
+import tkinter as tk
+from tkinter import ttk, messagebox
 from datetime import datetime
 
+ALL_LABEL = "(all)"
+
+
+def center_toplevel(window):
+    window.update_idletasks()
+    w = window.winfo_width()
+    h = window.winfo_height()
+    ws = window.winfo_screenwidth()
+    hs = window.winfo_screenheight()
+    x = (ws // 2) - (w // 2)
+    y = (hs // 2) - (h // 2)
+    window.geometry(f"{w}x{h}+{x}+{y}")
+
 
 class CountManager:
     def __init__(self, db):
         self.db = db
 
     def count_visits_by_date_gui(self, parent):
-        self.db.reload_data()  # ✅ Ensure fresh data before counting
-        # Ask user for date input in YYYY-MM-DD format
-        date_str = simpledialog.askstring("Count Visits", "Enter date (YYYY-MM-DD):", parent=parent)
-        if not date_str:
-            return
-
-        # Enforce strict format for user input
-        try:
-            user_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-        except ValueError:
-            messagebox.showerror("Invalid Date", "Please enter date in YYYY-MM-DD format.")
-            return
-
-        # Count matching visits
-        count = 0
-       
-        for record in self.db.get_all_visits():
-            if isinstance(record, dict):  # Ensure each record is a dictionary
-                visit_time_str = record.get("Visit_time", "").strip()
-
-                # Try to parse the visit date (M-D-YYYY format without leading zeros)
-                try:
-                    visit_date = datetime.strptime(visit_time_str, "%m/%d/%Y").date()
-                except ValueError:
-                    try:
-                        # If the visit has a time, we can still extract the date part
-                        visit_date = datetime.strptime(visit_time_str, "%m/%d/%Y %H:%M:%S").date()
-                    except ValueError:
-                        continue  # Skip if the visit_time format is unexpected
-
-                # Compare the dates
-                if visit_date == user_date:
-                    count += 1
-            else:
-                messagebox.showerror("Invalid Data", "Database contains invalid record format.")
+        """Dialog counting visits in a date range, optionally per department / chief complaint and period."""
+        engine = self.db.get_query_engine()
+
+        top = tk.Toplevel(parent)
+        top.title("Count Visits")
+
+        ttk.Label(top, text="From (YYYY-MM-DD):").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+        start_entry = ttk.Entry(top)
+        start_entry.grid(row=0, column=1, padx=5, pady=5)
+        start_entry.focus()
+
+        ttk.Label(top, text="To (YYYY-MM-DD, optional):").grid(row=1, column=0, padx=5, pady=5, sticky="e")
+        end_entry = ttk.Entry(top)
+        end_entry.grid(row=1, column=1, padx=5, pady=5)
+
+        ttk.Label(top, text="Department:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+        department_box = ttk.Combobox(top, values=[ALL_LABEL] + engine.departments(), state="readonly")
+        department_box.set(ALL_LABEL)
+        department_box.grid(row=2, column=1, padx=5, pady=5)
+
+        ttk.Label(top, text="Chief Complaint:").grid(row=3, column=0, padx=5, pady=5, sticky="e")
+        complaint_box = ttk.Combobox(top, values=[ALL_LABEL] + engine.complaints(), state="readonly")
+        complaint_box.set(ALL_LABEL)
+        complaint_box.grid(row=3, column=1, padx=5, pady=5)
+
+        ttk.Label(top, text="Break down by:").grid(row=4, column=0, padx=5, pady=5, sticky="e")
+        period_box = ttk.Combobox(top, values=["none", "week", "month", "quarter", "year"], state="readonly")
+        period_box.set("none")
+        period_box.grid(row=4, column=1, padx=5, pady=5)
+
+        result = ttk.Label(top, text="")
+        result.grid(row=6, column=0, columnspan=2, pady=(0, 5))
+        breakdown = tk.Listbox(top, height=8, width=40)
+
+        def run():
+            # Enforce strict format for user input
+            try:
+                start = datetime.strptime(start_entry.get().strip(), "%Y-%m-%d").date()
+                end_str = end_entry.get().strip()
+                end = datetime.strptime(end_str, "%Y-%m-%d").date() if end_str else start
+            except ValueError:
+                messagebox.showerror("Invalid Date", "Please enter dates in YYYY-MM-DD format.", parent=top)
+                return
+            if end < start:
+                messagebox.showerror("Invalid Range", "The end date is before the start date.", parent=top)
                 return
 
-        messagebox.showinfo("Visit Count", f"Number of visits on {user_date.isoformat()}: {count}")
-        
\ No newline at end of file
+            department = department_box.get() if department_box.get() != ALL_LABEL else None
+            complaint = complaint_box.get() if complaint_box.get() != ALL_LABEL else None
+
+            # Two binary searches on the sorted date index, whatever the range
+            count = self.db.count_visits(start, end, department, complaint)
+            span = start.isoformat() if start == end else f"{start.isoformat()} to {end.isoformat()}"
+            result.config(text=f"Number of visits on {span}: {count}")
+
+            breakdown.delete(0, tk.END)
+            if period_box.get() == "none":
+                breakdown.grid_remove()
+            else:
+                for label, n in self.db.count_visits_by(period_box.get(), start, end, department, complaint):
+                    breakdown.insert(tk.END, f"{label}: {n}")
+                breakdown.grid(row=7, column=0, columnspan=2, padx=5, pady=5)
+
+        ttk.Button(top, text="Count", command=run).grid(row=5, column=0, columnspan=2, pady=10)
+        top.bind("<Return>", lambda event: run())
+        center_toplevel(top)
\ No newline at end of file
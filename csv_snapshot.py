@@ -0,0 +1,128 @@
+import hashlib
+import os
+import pickle
+
+SNAPSHOT_SUFFIX = ".snapshot"
+SNAPSHOT_VERSION = 2
+HASH_CHUNK = 1 << 20
+
+
+def _hash_bytes(digest, f, size):
+    """Feed the next `size` bytes of open file f into digest."""
+    remaining = size
+    while remaining > 0:
+        chunk = f.read(min(HASH_CHUNK, remaining))
+        if not chunk:
+            break
+        digest.update(chunk)
+        remaining -= len(chunk)
+
+
+def prefix_digest(path, size):
+    """Hash of the first `size` bytes of a file."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        _hash_bytes(digest, f, size)
+    return digest.hexdigest()
+
+
+class LoadedPrefix:
+    """Fingerprint of the leading bytes of a file that are already parsed into memory.
+
+    Readers that later parse only what was appended check unchanged() first:
+    it is False once any of those bytes were edited, and the file must be read
+    again in full. The fingerprint starts from a snapshot's digest (or hashes
+    the first `size` bytes) and extend_to() folds in the bytes read after that.
+    """
+
+    def __init__(self, path, size=0, digest=None):
+        self.path = path
+        self.base_size = size
+        self.base_digest = digest if digest is not None or not size else prefix_digest(path, size)
+        self.size = size
+        self.tail = hashlib.blake2b(digest_size=20)  # Bytes [base_size, size)
+
+    @classmethod
+    def from_snapshot(cls, cache, size):
+        """Fingerprint of the first `size` bytes, reusing the digest cache last loaded or saved."""
+        header = cache.header
+        if header is None or header["size"] > size:
+            return cls(cache.source_path, size)
+        prefix = cls(cache.source_path, header["size"], header["digest"])
+        prefix.extend_to(size)
+        return prefix
+
+    def extend_to(self, size):
+        """Fold in bytes [self.size, size) of the file, once they have been read (or appended)."""
+        if size > self.size:
+            with open(self.path, "rb") as f:
+                f.seek(self.size)
+                _hash_bytes(self.tail, f, size - self.size)
+        self.size = size
+
+    def unchanged(self):
+        """True if the file still starts with exactly the bytes fingerprinted."""
+        if not self.size:
+            return True
+        try:
+            if os.path.getsize(self.path) < self.size:
+                return False
+            if self.base_size and prefix_digest(self.path, self.base_size) != self.base_digest:
+                return False
+            tail = hashlib.blake2b(digest_size=20)
+            with open(self.path, "rb") as f:
+                f.seek(self.base_size)
+                _hash_bytes(tail, f, self.size - self.base_size)
+        except OSError:
+            return False
+        return tail.digest() == self.tail.digest()
+
+
+class SnapshotCache:
+    """Parsed contents of a data file, pickled next to it as <file>.snapshot.
+
+    The snapshot records the size, mtime and hash of the bytes it was parsed
+    from. load() accepts it as is when size and mtime still match, and
+    otherwise checks the hash of that many leading bytes: if they are
+    unchanged the file was only appended to, and the caller parses just the
+    tail. Any other edit (or compaction) invalidates the snapshot. Like the
+    CSV files themselves, snapshots are trusted data of the data folder.
+    """
+
+    def __init__(self, source_path):
+        self.source_path = source_path
+        self.path = source_path + SNAPSHOT_SUFFIX
+        self.header = None  # Header of the snapshot last loaded or saved
+
+    def load(self):
+        """(payload, size) if the snapshot matches the first `size` bytes of the source, else None."""
+        try:
+            st = os.stat(self.source_path)
+            with open(self.path, "rb") as f:
+                header = pickle.load(f)
+                if header.get("version") != SNAPSHOT_VERSION or st.st_size < header["size"]:
+                    return None
+                if st.st_size != header["size"] or st.st_mtime_ns != header["mtime_ns"]:
+                    if prefix_digest(self.source_path, header["size"]) != header["digest"]:
+                        return None
+                payload = pickle.load(f)
+                self.header = header
+                return payload, header["size"]
+        except (OSError, EOFError, KeyError, AttributeError, pickle.UnpicklingError):
+            return None
+
+    def save(self, payload, size):
+        """Store payload as the parsed form of the source's first `size` bytes."""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            digest = prefix_digest(self.source_path, size)
+            st = os.stat(self.source_path)
+            header = {"version": SNAPSHOT_VERSION, "size": size, "digest": digest,
+                      "mtime_ns": st.st_mtime_ns if st.st_size == size else None}
+            with open(tmp_path, "wb") as f:
+                pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            self.header = header
+        except OSError as e:
+            print(f"Could not save snapshot '{self.path}': {e}")
\ No newline at end of file
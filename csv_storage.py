@@ -0,0 +1,396 @@
+import csv
+import io
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from file_lock import FileLock
+from note_store import NoteStore
+from csv_snapshot import SnapshotCache, LoadedPrefix
+from visit_record import VISIT_FIELDNAMES, compact_visits, to_columns, from_columns
+
+JOURNAL_NAME = "write_ahead.journal"
+TOMBSTONES_NAME = "deleted_records.csv"
+LOCK_NAME = "data.lock"
+GENERATION_NAME = "storage.generation"
+TOMBSTONE_FIELDNAMES = ["Patient_ID", "Kind", "Record_ID"]
+COMPACT_RATIO = 0.25  # Compact once deleted records reach this share of the live ones
+NOTE_FIELDNAMES = ["", "Patient_ID", "Visit_ID", "Note_ID", "Note_text"]
+
+
+def file_signature(path):
+    """Cheap change detector for a file: (mtime in ns, size), or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class CsvStore:
+    """Append-only writer for the CSV data files, protected by a write-ahead journal.
+
+    Every commit is first recorded in the journal (target file, its size before
+    the write and the rows to append). If the process dies mid-append,
+    recover() truncates the file back to that size and replays the rows, so a
+    commit is either fully on disk or not there at all. Full rewrites only
+    happen through rewrite(), which compaction uses; it replaces files only
+    once all of their new copies are written.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.journal_path = os.path.join(data_dir, JOURNAL_NAME)
+
+    def commit(self, writes):
+        """Append rows to one or more CSV files as a single journaled transaction.
+
+        writes is a list of (path, fieldnames, rows) tuples.
+        """
+        entries = []
+        for path, fieldnames, rows in writes:
+            if rows:
+                entries.append({
+                    "path": path,
+                    "offset": os.path.getsize(path) if os.path.exists(path) else 0,
+                    "fieldnames": list(fieldnames),
+                    "rows": [dict(row) for row in rows],
+                })
+        if not entries:
+            return
+
+        self._write_journal(entries)
+        for entry in entries:
+            self._append(entry)
+        os.remove(self.journal_path)
+
+    def recover(self):
+        """Replay an unfinished commit left behind by a crash; returns True if one was found."""
+        if not os.path.exists(self.journal_path):
+            return False
+
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except ValueError:
+            # The journal itself was never completed, so no data file was touched
+            os.remove(self.journal_path)
+            return False
+
+        for entry in entries:
+            if os.path.exists(entry["path"]):
+                with open(entry["path"], "r+b") as f:
+                    f.truncate(entry["offset"])
+            self._append(entry)
+        os.remove(self.journal_path)
+        print(f"Recovered unfinished write from '{self.journal_path}'.")
+        return True
+
+    def rewrite(self, writes):
+        """Replace one or more CSV files in full (used by compaction).
+
+        writes is a list of (path, fieldnames, rows) tuples. Every file is
+        written to a .tmp copy first; if any of them fails, the copies are
+        removed, no file is replaced and the OSError propagates.
+        """
+        staged = []
+        try:
+            for path, fieldnames, rows in writes:
+                tmp_path = path + ".tmp"
+                staged.append(tmp_path)
+                with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+                    writer = csv.DictWriter(f, fieldnames=list(fieldnames))
+                    writer.writeheader()
+                    writer.writerows(rows)
+                    f.flush()
+                    os.fsync(f.fileno())
+        except OSError:
+            for tmp_path in staged:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            raise
+        for (path, _, _), tmp_path in zip(writes, staged):
+            os.replace(tmp_path, path)
+
+    def _write_journal(self, entries):
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def _append(self, entry):
+        path = entry["path"]
+        needs_header = entry["offset"] == 0
+        needs_newline = False
+        if not needs_header:
+            with open(path, "rb") as f:
+                f.seek(entry["offset"] - 1)
+                needs_newline = f.read(1) != b"\n"
+
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            if needs_newline:
+                f.write("\r\n")
+            writer = csv.DictWriter(f, fieldnames=entry["fieldnames"])
+            if needs_header:
+                writer.writeheader()
+            writer.writerows(entry["rows"])
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class CsvBackend:
+    """HospitalDatabase storage backend that keeps visits and notes in Patient_data.csv / Notes.csv.
+
+    Deleting a patient does not rewrite the files: the removed Visit_IDs and
+    Note_IDs are appended to deleted_records.csv and filtered out on load.
+    compact() drops them from the files for good, and HospitalDatabase runs it
+    once needs_compaction() says enough records have piled up.
+
+    Several processes may share the data folder. Commits run inside locked(),
+    a short cross-process lock, and read_changes() picks up what the other
+    processes appended since this one last looked by reading only the file
+    tails, after checking that the part already read was not edited. Compaction bumps the generation stamp in storage.generation, which
+    tells the other processes that byte offsets moved and they must reload.
+    """
+
+    def __init__(self, csv_file, notes_file=None):
+        self.csv_file = csv_file
+        self.notes_file = notes_file
+        self.visit_fieldnames = VISIT_FIELDNAMES
+        self.data_dir = os.path.dirname(os.path.abspath(csv_file))
+        self.store = CsvStore(self.data_dir)
+        self.note_store = NoteStore(notes_file) if notes_file else None
+        self.tombstones_file = os.path.join(self.data_dir, TOMBSTONES_NAME)
+        self.lock_path = os.path.join(self.data_dir, LOCK_NAME)
+        self.generation_path = os.path.join(self.data_dir, GENERATION_NAME)
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+        self.generation = None   # Generation stamp the offsets below belong to
+        self.visit_offset = 0    # Bytes of Patient_data.csv already loaded into memory
+        self.visit_prefix = LoadedPrefix(csv_file)  # Fingerprint of those bytes
+        self.tombstone_offset = 0
+        # Finish any append that was interrupted before reading the files
+        with self.locked():
+            self.load_tombstones()
+
+    @contextmanager
+    def locked(self):
+        """Hold the data folder's cross-process write lock; re-entrant within a thread.
+
+        Also finishes a commit that a crashed process left in the journal.
+        """
+        with self._thread_lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with FileLock(self.lock_path):
+                self.store.recover()
+                self._lock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth = 0
+
+    def read_generation(self):
+        try:
+            with open(self.generation_path, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _bump_generation(self):
+        self.generation = self.read_generation() + 1
+        tmp_path = self.generation_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(self.generation))
+        os.replace(tmp_path, self.generation_path)
+
+    def load_tombstones(self):
+        """Read the Visit_IDs and Note_IDs deleted since the last compaction."""
+        self.deleted = {"Visit_ID": set(), "Note_ID": set()}
+        rows, self.tombstone_offset = self._read_tail(self.tombstones_file, 0, TOMBSTONE_FIELDNAMES)
+        for row in rows:
+            self.deleted.setdefault(row["Kind"], set()).add(row["Record_ID"])
+
+    def _read_tail(self, path, offset, fieldnames):
+        """Rows stored after byte offset in a CSV file, plus the new end offset."""
+        if not os.path.exists(path):
+            return [], 0
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        reader = csv.DictReader(io.StringIO(data.decode("utf-8"), newline=""),
+                                fieldnames=None if offset == 0 else fieldnames)
+        return list(reader), offset + len(data)
+
+    def load_csv(self, path):
+        """Read CSV and return list of dicts."""
+        try:
+            with open(path, mode='r', encoding='utf-8', newline='') as file:
+                reader = csv.DictReader(file)
+                rows = list(reader)
+                if path == self.csv_file and reader.fieldnames:
+                    self.visit_fieldnames = list(reader.fieldnames)
+                return rows
+        except FileNotFoundError:
+            print(f"Error: The file '{path}' was not found.")
+            return []
+
+    def signature(self):
+        return (file_signature(self.csv_file), file_signature(self.notes_file) if self.notes_file else None,
+                file_signature(self.tombstones_file))
+
+    def load_visits(self):
+        self.load_tombstones()
+        self.generation = self.read_generation()
+        self.visit_offset = os.path.getsize(self.csv_file) if os.path.exists(self.csv_file) else 0
+        deleted = self.deleted["Visit_ID"]
+        return [row for row in self._load_visit_rows() if row.get("Visit_ID") not in deleted]
+
+    def _load_visit_rows(self):
+        """All rows of Patient_data.csv, from its snapshot when the file is unchanged (or only appended to)."""
+        if not os.path.exists(self.csv_file):
+            self.visit_prefix = LoadedPrefix(self.csv_file)
+            return self.load_csv(self.csv_file)
+
+        cache = SnapshotCache(self.csv_file)
+        cached = cache.load()
+        if cached is None:
+            rows = compact_visits(self.load_csv(self.csv_file))
+        else:
+            (fieldnames, columns), size = cached
+            rows = from_columns(columns)
+            self.visit_fieldnames = fieldnames
+            if size == self.visit_offset:
+                self.visit_prefix = LoadedPrefix.from_snapshot(cache, self.visit_offset)
+                return rows
+            tail, _ = self._read_tail(self.csv_file, size, fieldnames)
+            rows.extend(compact_visits(tail))
+        cache.save((self.visit_fieldnames, to_columns(rows)), self.visit_offset)
+        self.visit_prefix = LoadedPrefix.from_snapshot(cache, self.visit_offset)
+        return rows
+
+    def load_notes(self):
+        """Note IDs only; the text stays in Notes.csv until read_note_text() asks for it."""
+        if not self.note_store:
+            return []
+        deleted = self.deleted["Note_ID"]
+        return [note for note in self.note_store.scan() if note.get("Note_ID") not in deleted]
+
+    def read_note_text(self, note):
+        return self.note_store.read_text(note) if self.note_store else ""
+
+    def read_changes(self, include_notes=True):
+        """What other processes committed since this one last loaded, read from the file tails.
+
+        Returns (visits, notes, deleted) where deleted maps "Visit_ID"/"Note_ID"
+        to newly tombstoned IDs, or None if the files must be reloaded in full:
+        they were compacted meanwhile, or edited rather than appended to.
+        include_notes=False skips the notes file (for callers that have not
+        loaded notes yet). Call inside locked().
+        """
+        if self.read_generation() != self.generation or not self.visit_prefix.unchanged():
+            return None
+        if self.note_store and include_notes and not self.note_store.unchanged():
+            return None
+
+        visits, self.visit_offset = self._read_tail(self.csv_file, self.visit_offset, self.visit_fieldnames)
+        self.visit_prefix.extend_to(self.visit_offset)
+        notes = self.note_store.scan_tail() if self.note_store and include_notes else []
+        rows, self.tombstone_offset = self._read_tail(self.tombstones_file, self.tombstone_offset, TOMBSTONE_FIELDNAMES)
+        deleted = {"Visit_ID": set(), "Note_ID": set()}
+        for row in rows:
+            deleted.setdefault(row["Kind"], set()).add(row["Record_ID"])
+            self.deleted.setdefault(row["Kind"], set()).add(row["Record_ID"])
+
+        visits = [row for row in visits if row.get("Visit_ID") not in self.deleted["Visit_ID"]]
+        notes = [note for note in notes if note.get("Note_ID") not in self.deleted["Note_ID"]]
+        return visits, notes, deleted
+
+    def append(self, visits, notes):
+        """Append new rows to the end of both files in one journaled commit (call inside locked())."""
+        writes = [(self.csv_file, self.visit_fieldnames, visits)]
+        if self.notes_file:
+            writes.append((self.notes_file, NOTE_FIELDNAMES, notes))
+        self.store.commit(writes)
+        if os.path.exists(self.csv_file):
+            self.visit_offset = os.path.getsize(self.csv_file)
+            self.visit_prefix.extend_to(self.visit_offset)
+        if notes and self.note_store:
+            self.note_store.scan_tail()  # Locate the appended records
+
+    def delete_patients(self, removed_visits, removed_notes):
+        """Record the removed visits and notes as tombstones in one journaled append."""
+        rows = [{"Patient_ID": row.get("Patient_ID", ""), "Kind": "Visit_ID", "Record_ID": row.get("Visit_ID", "")}
+                for row in removed_visits]
+        rows += [{"Patient_ID": note.get("Patient_ID", ""), "Kind": "Note_ID", "Record_ID": note.get("Note_ID", "")}
+                 for note in removed_notes]
+        self.store.commit([(self.tombstones_file, TOMBSTONE_FIELDNAMES, rows)])
+        self.tombstone_offset = os.path.getsize(self.tombstones_file)
+        for row in rows:
+            self.deleted[row["Kind"]].add(row["Record_ID"])
+
+    def needs_compaction(self, visits, notes):
+        """True once the tombstoned records are worth a full rewrite of the files."""
+        deleted = len(self.deleted["Visit_ID"]) + len(self.deleted["Note_ID"])
+        return deleted > 0 and deleted >= COMPACT_RATIO * (len(visits) + len(notes))
+
+    def compact(self, visits, notes):
+        """Rewrite both files in full without the deleted records, renumbering the note index column."""
+        for idx, note in enumerate(notes, start=1):
+            note[""] = str(idx)  # Set the placeholder index
+
+        note_rows = self.note_store.iter_full_rows(notes) if self.note_store else []
+        writes = [(path, fieldnames, rows) for rows, path, fieldnames in (
+            (visits, self.csv_file, self.visit_fieldnames), (note_rows, self.notes_file, NOTE_FIELDNAMES)) if path]
+        try:
+            self.store.rewrite(writes)
+        except OSError as e:
+            # The tombstones stay, so the deleted records remain hidden on every load
+            print(f"An error occurred while compacting '{self.data_dir}': {e}")
+            self._after_rewrite()  # A file may already have been replaced
+            raise
+
+        for path, _, _ in writes:
+            print(f"Database '{path}' updated successfully.")
+        # Only drop the tombstones once the files no longer hold the deleted rows
+        if os.path.exists(self.tombstones_file):
+            os.remove(self.tombstones_file)
+        self.deleted = {"Visit_ID": set(), "Note_ID": set()}
+        self.tombstone_offset = 0
+        self._after_rewrite()
+
+    def _after_rewrite(self):
+        if self.note_store:
+            self.note_store.scan()  # Offsets moved; the returned IDs match the notes already in memory
+        self.visit_offset = os.path.getsize(self.csv_file) if os.path.exists(self.csv_file) else 0
+        self.visit_prefix = LoadedPrefix(self.csv_file, self.visit_offset)
+        self._bump_generation()  # Other processes' offsets into the old files are now meaningless
+
+
+if __name__ == "__main__":
+    # Usage: python csv_storage.py compact [data_dir]
+    from hospital_database import HospitalDatabase
+
+    if len(sys.argv) < 2 or sys.argv[1] != "compact":
+        print("Usage: python csv_storage.py compact [data_dir]")
+        sys.exit(1)
+
+    data_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    db = HospitalDatabase(
+        csv_file=os.path.join(data_dir, "Patient_data.csv"),
+        notes_file=os.path.join(data_dir, "Notes.csv"),
+    )
+    try:
+        db.compact()
+    except OSError as e:
+        print(f"Compaction failed; the data files were left as they were: {e}")
+        sys.exit(1)
+    print(f"Compacted {len(db.data)} visits and {len(db.notes)} notes in '{data_dir}'.")
\ No newline at end of file
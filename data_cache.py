@@ -0,0 +1,28 @@
+import os
+import threading
+from hospital_database import HospitalDatabase
+from sqlite_storage import SqliteBackend
+
+# One parsed HospitalDatabase per set of data files, shared by every window in the process
+_databases = {}
+_lock = threading.Lock()
+
+
+def get_database(data_path, notes_path, sqlite_path=None):
+    """Return the shared HospitalDatabase for these files, reloading it only if they changed on disk.
+
+    The app's own writes keep the database in sync, so they never trigger a reload;
+    an edit made outside the app (another program, another workstation) does.
+    """
+    use_sqlite = bool(sqlite_path) and os.path.exists(sqlite_path)
+    key = (data_path, notes_path, sqlite_path if use_sqlite else None)
+
+    with _lock:
+        db = _databases.get(key)
+        if db is None:
+            backend = SqliteBackend(sqlite_path) if use_sqlite else None
+            db = HospitalDatabase(csv_file=data_path, notes_file=notes_path, backend=backend, lazy_notes=True)
+            _databases[key] = db
+            return db
+    db.refresh()
+    return db
\ No newline at end of file
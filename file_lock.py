@@ -0,0 +1,49 @@
+import os
+import time
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class FileLock:
+    """Exclusive cross-process lock on a lock file, used as a context manager.
+
+    Blocks until the lock is free (or raises TimeoutError after timeout seconds).
+    Works between processes and between workstations sharing the data folder,
+    as far as the file system honours byte-range locks.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a+b")
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                if os.name == "nt":
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+                else:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return self
+            except OSError:
+                if time.monotonic() > deadline:
+                    self._file.close()
+                    raise TimeoutError(f"Timed out waiting for lock '{self.path}'")
+                time.sleep(0.01)
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if os.name == "nt":
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+            self._file = None
\ No newline at end of file
@@ -1,17 +1,45 @@
 import os
-import matplotlib.pyplot as plt
-from collections import defaultdict
+import json
+import hashlib
 from datetime import datetime
-from dateutil import parser
+from visit_analytics import VisitColumns
+from visit_aggregates import VisitAggregates
+from perf_metrics import timed
+
+def render_chart(spec, filepath):
+    """Draw one chart spec to a PNG with the non-interactive Agg canvas (no GUI backend needed)."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(10, 5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if spec["kind"] == "line":
+        ax.plot(spec["x"], spec["y"], marker="o", color=spec["color"])
+    else:
+        ax.bar(spec["x"], spec["y"], color=spec["color"])
+    ax.set_title(spec["title"])
+    ax.set_xlabel(spec["xlabel"])
+    ax.set_ylabel(spec["ylabel"])
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        if spec["kind"] == "bar":
+            label.set_horizontalalignment("right")
+    fig.tight_layout()
+    fig.savefig(filepath)
+    return filepath
 
 class GraphGenerator:
-    def __init__(self, visit_records):  # Expecting a list of dicts
+    def __init__(self, visit_records):  # Expecting precomputed VisitAggregates or a list of dicts
         today_str = datetime.today().strftime("%m-%d-%Y")
         self.output_dir = f"Hospital Statistics {today_str}"
         os.makedirs(self.output_dir, exist_ok=True)
 
-        # Sanitize input
-        self.db = [r for r in visit_records if isinstance(r, dict)]
+        # Only plot the numbers we are given; raw records are aggregated once here
+        if isinstance(visit_records, VisitAggregates):
+            self.aggregates = visit_records
+        else:
+            self.aggregates = VisitAggregates.from_columns(VisitColumns(visit_records))
 
     def get_timestamped_filepath(self, base_filename, ext="png"):
         from datetime import datetime
@@ -20,12 +48,7 @@ class GraphGenerator:
         return os.path.join(self.output_dir, filename)
 
     def count_chief_complaints(self):
-        complaint_count = {}
-
-        for visit_data in self.db:
-            chief_complaint = visit_data.get("Chief_complaint", "").strip()
-            if chief_complaint:
-                complaint_count[chief_complaint] = complaint_count.get(chief_complaint, 0) + 1
+        complaint_count = dict(self.aggregates.per_complaint)
 
         if not complaint_count:
             print("No chief complaint data found.")
@@ -34,6 +57,8 @@ class GraphGenerator:
         self.show_complaint_graph(complaint_count)
 
     def show_complaint_graph(self, complaint_count):
+        import matplotlib.pyplot as plt
+
         complaints = list(complaint_count.keys())
         counts = list(complaint_count.values())
 
@@ -50,19 +75,16 @@ class GraphGenerator:
         plt.show()
 
     def generate_department_graph(self):
-        departments = defaultdict(int)
+        import matplotlib.pyplot as plt
 
-        for visit in self.db:
-            dept = visit.get("Visit_department", "Unknown").strip()
-            if dept:
-                departments[dept] += 1
+        departments = dict(self.aggregates.per_department)
 
         if not departments:
             print("No department data found.")
             return
 
         plt.figure(figsize=(10, 5))
-        plt.bar(departments.keys(), departments.values(), color="skyblue")
+        plt.bar(list(departments.keys()), list(departments.values()), color="skyblue")
         plt.title("Department Visit Counts")
         plt.xlabel("Department")
         plt.ylabel("Number of Visits")
@@ -74,18 +96,9 @@ class GraphGenerator:
         plt.show()
 
     def generate_visits_per_year_graph(self):
-        visits_by_year = defaultdict(int)
+        import matplotlib.pyplot as plt
 
-        for visit in self.db:
-            date_str = visit.get("Visit_time", "").strip()
-            if not date_str:
-                continue
-
-            try:
-                date_obj = parser.parse(date_str)
-                visits_by_year[date_obj.year] += 1
-            except Exception as e:
-                print(f"Skipping invalid date: {date_str} ({e})")
+        visits_by_year = self.aggregates.per_year
 
         if not visits_by_year:
             print("No valid visit data available.")
@@ -106,6 +119,54 @@ class GraphGenerator:
         plt.savefig(filepath)
         plt.show()
 
+    def chart_specs(self):
+        """The three statistics charts as plain data (labels, counts and styling)."""
+        specs = []
+        complaints = self.aggregates.per_complaint
+        if complaints:
+            specs.append({"name": "Patient Chief Complaints", "kind": "bar", "color": None,
+                          "x": list(complaints), "y": list(complaints.values()),
+                          "title": "Occurrences of Chief Complaints",
+                          "xlabel": "Chief Complaint", "ylabel": "Number of Occurrences"})
+        departments = self.aggregates.per_department
+        if departments:
+            specs.append({"name": "Hospital Department Visits", "kind": "bar", "color": "skyblue",
+                          "x": list(departments), "y": list(departments.values()),
+                          "title": "Department Visit Counts", "xlabel": "Department", "ylabel": "Number of Visits"})
+        years = sorted(self.aggregates.per_year)
+        if years:
+            specs.append({"name": "Yearly Hosptial Visits", "kind": "line", "color": "green",
+                          "x": years, "y": [self.aggregates.per_year[year] for year in years],
+                          "title": "Visits per Year", "xlabel": "Year", "ylabel": "Number of Visits"})
+        return specs
+
+    def get_cached_filepath(self, spec, ext="png"):
+        """Output path named by a hash of the chart's data, so identical inputs map to the same file."""
+        digest = hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.output_dir, f"{spec['name']}_{digest}.{ext}")
+
+    def render_all(self):
+        """Render every chart headlessly (no plt.show); returns the PNG paths.
+
+        Charts whose aggregated inputs are unchanged are served from disk; the
+        rest are drawn inline, since a worker process would cost more to start
+        (and import matplotlib) than the few charts here take to draw.
+        """
+        paths = []
+        pending = []
+        for spec in self.chart_specs():
+            filepath = self.get_cached_filepath(spec)
+            paths.append(filepath)
+            if not os.path.exists(filepath):
+                pending.append((spec, filepath))
+
+        with timed("Render charts"):
+            for spec, filepath in pending:
+                render_chart(spec, filepath)
+
+        print(f"Rendered {len(pending)} graph(s); {len(paths) - len(pending)} unchanged and reused.")
+        return paths
+
     def generate_all(self):
         self.count_chief_complaints()
         self.generate_department_graph()
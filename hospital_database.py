@@ -1,48 +1,508 @@
-import csv
+import contextlib
+import os
+import threading
+from csv_storage import CsvBackend
+from visit_aggregates import VisitAggregates, AGGREGATES_NAME
+from visit_query import VisitQueryEngine
+from visit_dates import visit_ordinal
+from patient_timeline import PatientTimeline
+from visit_record import compact_visits
+from note_search import NoteSearchIndex, SEARCH_INDEX_NAME
+from id_allocator import IdAllocator, ALLOCATOR_NAME
+from perf_metrics import timed
 
 class HospitalDatabase:
-    def __init__(self, csv_file=None, preloaded_data=None):
+    """Visits and notes held in memory with lookup indexes, persisted through a storage backend.
+
+    The backend defaults to the CSV files (CsvBackend); pass backend=SqliteBackend(path)
+    to run on an embedded SQLite file instead. Either way the read API is the same.
+    Writes, reloads and lazily built structures are guarded by self.lock so the
+    database can be shared with background worker threads.
+
+    Other processes (workstations) may write to the same storage. Reads are
+    served from memory and never wait on them; every write first takes the
+    backend's short cross-process lock and merges what the others committed
+    since the last sync, so concurrent adds and removals are combined rather
+    than overwritten.
+
+    With lazy_notes=True the notes are only read from storage the first time
+    anything asks for them (notes, note_index, visit_notes, patient_notes),
+    so roles that never look at notes never pay for loading them.
+    """
+
+    def __init__(self, csv_file=None, preloaded_data=None, notes_file=None, preloaded_notes=None, backend=None,
+                 lazy_notes=False):
         self.csv_file = csv_file  # ✅ Store the file path
-        if preloaded_data:
-            self.data = preloaded_data
-        elif csv_file:
-            self.data = self.load_csv(csv_file)
-        else:
-            self.data = []
+        self.notes_file = notes_file
+        self.lazy_notes = lazy_notes
+        self.lock = threading.RLock()
+        if backend is None and csv_file:
+            backend = CsvBackend(csv_file, notes_file)
+        self.backend = backend
+
+        with self._storage_locked(), timed("Load data"):
+            if preloaded_data:
+                self.data = compact_visits(preloaded_data)
+            elif self.backend:
+                self.data = compact_visits(self.backend.load_visits())
+            else:
+                self.data = []
+
+            if preloaded_notes:
+                self.notes = preloaded_notes
+            elif self.backend and lazy_notes:
+                self.notes = None  # Read on first use
+            elif self.backend:
+                self.notes = self.backend.load_notes()
+            else:
+                self.notes = []
+
+            self.build_indexes()
+            self.mark_synced()
+
+        allocator_path = os.path.join(self.backend.data_dir, ALLOCATOR_NAME) if self.backend else None
+        self.id_allocator = IdAllocator(allocator_path, in_use=self._id_in_use)
 
-    def load_csv(self, path):
-        """Read CSV and return list of dicts."""
-        try:
-            with open(path, mode='r', encoding='utf-8') as file:
-                return list(csv.DictReader(file))
-        except FileNotFoundError:
-            print(f"Error: The file '{path}' was not found.")
-            return []
+    def _storage_locked(self):
+        """The backend's cross-process write lock (a no-op without a backend)."""
+        return self.backend.locked() if self.backend else contextlib.nullcontext()
 
     def reload_data(self):
-        """Reload data from CSV to ensure freshness."""
-        if self.csv_file:
-            self.data = self.load_csv(self.csv_file)
-
-    def save_data(self):
-        try:
-            with open(self.csv_file, mode='w', encoding='utf-8', newline='') as file:
-                if not self.data:
-                    return
-                fieldnames = self.data[0].keys()
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writeheader()
-                for row in self.data:
-                    writer.writerow(row)
-        except Exception as e:
-            print(f"Error saving file: {e}")
+        """Reload data from the backend to ensure freshness."""
+        with self.lock, self._storage_locked():
+            self._reload()
+
+    def _reload(self):
+        with timed("Load data"):
+            if self.backend:
+                self.data = compact_visits(self.backend.load_visits())
+                self.notes = None if self.lazy_notes else self.backend.load_notes()
+            self.build_indexes()
+            self.mark_synced()
+
+    @property
+    def notes(self):
+        if self._notes is None:
+            self.load_notes()
+        return self._notes
+
+    @notes.setter
+    def notes(self, notes):
+        self._notes = notes
+
+    @property
+    def note_index(self):
+        if self._notes is None:
+            self.load_notes()
+        return self._note_index
+
+    @property
+    def visit_notes(self):
+        if self._notes is None:
+            self.load_notes()
+        return self._visit_notes
+
+    @property
+    def patient_notes(self):
+        if self._notes is None:
+            self.load_notes()
+        return self._patient_notes
+
+    def load_notes(self):
+        """Read and index the notes deferred by lazy_notes now (no-op once loaded)."""
+        with self.lock, self._storage_locked(), timed("Load notes"):
+            if self._notes is not None:
+                return  # Another thread loaded them while this one waited
+            notes = self.backend.load_notes() if self.backend else []
+            for note in notes:
+                self._index_note(note)
+            self._notes = notes
+
+    def mark_synced(self):
+        """Remember the storage state that matches memory, so only outside edits count as stale."""
+        self.synced_signature = self.backend.signature() if self.backend else None
+
+    def is_stale(self):
+        """True if the storage was changed by someone other than this object since the last sync."""
+        return bool(self.backend) and self.backend.signature() != self.synced_signature
+
+    def refresh(self):
+        """Catch up with changes made outside this process; returns True if there were any."""
+        with self.lock:
+            if not self.is_stale():
+                return False
+            with self._storage_locked():
+                self._merge_outside_changes()
+            return True
+
+    def _merge_outside_changes(self):
+        """Fold other processes' commits into memory (call holding both locks).
+
+        Appends and deletions are merged from the file tails; a compaction by
+        someone else (or a backend without a change feed) means a full reload.
+        """
+        if not self.is_stale():
+            return
+        with timed("Read outside changes"):
+            changes = self.backend.read_changes(include_notes=self._notes is not None)
+        if changes is None:
+            self._reload()
+            return
+        visits, notes, deleted = changes
+        self.mark_synced()
+        self._apply_added(compact_visits(visits), notes)
+        self._drop_records(deleted.get("Visit_ID", ()), deleted.get("Note_ID", ()))
+
+    def build_indexes(self):
+        """Rebuild the Patient_ID, Visit_ID and Note_ID lookup tables from scratch."""
+        self.patient_index = {}  # Patient_ID -> list of visit rows
+        self.timelines = {}      # Patient_ID -> PatientTimeline (visits in date order)
+        self.visit_index = {}    # Visit_ID -> visit row
+        self._note_index = {}     # Note_ID -> note row
+        self._visit_notes = {}    # Visit_ID -> list of note rows
+        self._patient_notes = {}  # Patient_ID -> list of note rows
+        self._columns = None     # VisitColumns, built on first analytics request
+        self._aggregates = None  # VisitAggregates, loaded or built on first count request
+        self._query_engine = None  # VisitQueryEngine, built on first date-range query
+        self._cohort_index = None  # CohortIndex, built on first cohort count
+        self._search_index = None  # NoteSearchIndex, loaded or built on first search
+        for row in self.data:
+            self._index_visit(row)
+        for note in self._notes or []:
+            self._index_note(note)
+
+    def _index_visit(self, row):
+        patient_id = row.get("Patient_ID")
+        self.patient_index.setdefault(patient_id, []).append(row)
+        timeline = self.timelines.get(patient_id)
+        if timeline is None:
+            timeline = self.timelines[patient_id] = PatientTimeline()
+        timeline.add(row, visit_ordinal(row.get("Visit_time", "")))
+        self.visit_index[row.get("Visit_ID")] = row
+        self._columns = None
+
+    def _index_note(self, note):
+        self._note_index[note.get("Note_ID")] = note
+        self._visit_notes.setdefault(note.get("Visit_ID"), []).append(note)
+        self._patient_notes.setdefault(note.get("Patient_ID"), []).append(note)
+
+    def compact(self):
+        """Rewrite the underlying storage in full (renumbers the note index column).
+
+        Raises OSError if the files could not be rewritten; the deleted records
+        stay recorded as tombstones, so none of them come back.
+        """
+        with self.lock:
+            if self.backend:
+                with self.backend.locked():
+                    self._merge_outside_changes()
+                    with timed("Compact storage"):
+                        self.backend.compact(self.data, self.notes)
+                    self.mark_synced()
+
+    def has_patient(self, patient_id):
+        return str(patient_id) in self.patient_index
 
     def get_patient(self, patient_id):
-        return [row for row in self.data if row.get("Patient_ID") == str(patient_id)]
+        return list(self.patient_index.get(str(patient_id), []))
+
+    def get_latest_visit(self, patient_id):
+        """The patient's most recent visit (last one on the latest date), or None."""
+        timeline = self.timelines.get(str(patient_id))
+        return timeline.latest() if timeline else None
+
+    def get_patient_history(self, patient_id):
+        """The patient's visits, oldest first."""
+        timeline = self.timelines.get(str(patient_id))
+        return timeline.history() if timeline else []
+
+    def get_visit(self, visit_id):
+        return self.visit_index.get(str(visit_id))
+
+    def get_note(self, note_id):
+        return self.note_index.get(str(note_id))
+
+    def get_notes_for_visit(self, visit_id):
+        return list(self.visit_notes.get(str(visit_id), []))
+
+    def get_note_text(self, note):
+        """Note text is kept out of memory and read from storage only when it is shown."""
+        with self.lock:
+            if "Note_text" in note:
+                return note["Note_text"]
+            return self.backend.read_note_text(note) if self.backend else ""
+
+    def _note_metadata(self, note_record):
+        if not self.backend:
+            return note_record
+        return {key: value for key, value in note_record.items() if key != "Note_text"}
 
-    def add_visit_record(self, visit_record):
-        self.data.append(visit_record)
-        self.save_data()
+    def add_visit_record(self, visit_record, note_record=None):
+        """Store a visit (and optionally its note) in memory and in the backend as one commit."""
+        self.add_records([visit_record], [note_record] if note_record is not None else [])
+
+    def add_note_record(self, note_record):
+        self.add_records([], [note_record])
+
+    def add_records(self, visits, notes):
+        """Store any number of visits and notes as a single backend commit (used for bulk loads)."""
+        visits = compact_visits(visits)
+        with self.lock, self._storage_locked():
+            if self.backend:
+                self._merge_outside_changes()
+                with timed("Save visit"):
+                    self.backend.append(visits, notes)
+                self.mark_synced()
+            self._apply_added(visits, notes)  # Saved aggregates/search index are shared files too
+
+    def _apply_added(self, visits, notes):
+        """Index newly stored visits and notes and fold them into the aggregates and search index."""
+        with self.lock:
+            if self._notes is None:
+                notes = []  # Not loaded yet; they will be read with the rest
+                self._search_index = None
+            if self._search_index is not None:
+                for note in notes:
+                    text = note["Note_text"] if "Note_text" in note else self.get_note_text(note)
+                    self._search_index.record_add(note.get("Note_ID"), text, self.synced_signature)
+
+            for visit_record in visits:
+                self.data.append(visit_record)
+                self._index_visit(visit_record)
+            for note in notes:
+                note = self._note_metadata(note)
+                self.notes.append(note)
+                self._index_note(note)
+
+            if self._aggregates is not None and visits:
+                for visit_record in visits:
+                    self._aggregates.add(visit_record)
+                self._aggregates.save(self.synced_signature)
+            if self._query_engine is not None:
+                for visit_record in visits:
+                    self._query_engine.add(visit_record)
+            if self._cohort_index is not None:
+                for visit_record in visits:
+                    self._cohort_index.add(visit_record)
+
+    def remove_patient(self, patient_id):
+        """Delete a patient with all of their visits and notes; returns the removed visits."""
+        return self.remove_patients([patient_id])
+
+    def remove_patients(self, patient_ids):
+        """Delete several patients with one storage write; returns the removed visits.
+
+        The backend records the deletions as tombstones and the files are only
+        rewritten (compacted) once enough deleted records have accumulated.
+        If that rewrite fails, the removal still stands and OSError is raised.
+        """
+        with self.lock, self._storage_locked():
+            if self.backend:
+                self._merge_outside_changes()  # Also remove visits other workstations added meanwhile
+            patient_ids = {str(patient_id) for patient_id in patient_ids}
+            removed, removed_notes = [], []
+            compact_error = None
+            for patient_id in patient_ids:
+                removed.extend(self.patient_index.pop(patient_id, []))
+                self.timelines.pop(patient_id, None)
+                removed_notes.extend(self.patient_notes.pop(patient_id, []))
+            if not removed and not removed_notes:
+                return []
+
+            for row in removed:
+                self.visit_index.pop(row.get("Visit_ID"), None)
+            for note in removed_notes:
+                self.note_index.pop(note.get("Note_ID"), None)
+                self.visit_notes.pop(note.get("Visit_ID"), None)
+
+            self.data = [row for row in self.data if row.get("Patient_ID") not in patient_ids]
+            self._columns = None
+            self.notes = [note for note in self.notes if note.get("Patient_ID") not in patient_ids]
+
+            if self.backend:
+                with timed("Save removal"):
+                    self.backend.delete_patients(removed, removed_notes)
+                if self.backend.needs_compaction(self.data, self.notes):
+                    try:
+                        with timed("Compact storage"):
+                            self.backend.compact(self.data, self.notes)
+                    except OSError as e:
+                        compact_error = e  # The removal itself is saved; reported once memory is updated
+                self.mark_synced()
+
+            if self._aggregates is not None:
+                for row in removed:
+                    self._aggregates.remove(row)
+                self._aggregates.save(self.synced_signature)
+            if self._query_engine is not None:
+                for row in removed:
+                    self._query_engine.remove(row)
+            if self._cohort_index is not None:
+                for row in removed:
+                    self._cohort_index.remove(row)
+            if self._search_index is not None:
+                for note in removed_notes:
+                    self._search_index.record_remove(note.get("Note_ID"), self.synced_signature)
+            if compact_error is not None:
+                raise OSError(f"The removal was saved, but compacting the data files failed: {compact_error}") \
+                    from compact_error
+            return removed
+
+    def _drop_records(self, visit_ids, note_ids):
+        """Remove individual visits and notes that another process deleted."""
+        visit_ids, note_ids = set(visit_ids), set(note_ids)
+        if not visit_ids and not note_ids:
+            return
+        removed = [row for row in self.data if row.get("Visit_ID") in visit_ids]
+        self.data = [row for row in self.data if row.get("Visit_ID") not in visit_ids]
+        self._columns = None
+        if self._notes is None:
+            removed_notes = []  # The backend already filters them out of the deferred load
+            self._search_index = None
+        else:
+            removed_notes = [note for note in self._notes if note.get("Note_ID") in note_ids]
+            self.notes = [note for note in self._notes if note.get("Note_ID") not in note_ids]
+
+        for row in removed:
+            self.visit_index.pop(row.get("Visit_ID"), None)
+            rows = self.patient_index.get(row.get("Patient_ID"), [])
+            rows[:] = [other for other in rows if other is not row]
+            if not rows:
+                self.patient_index.pop(row.get("Patient_ID"), None)
+            timeline = self.timelines.get(row.get("Patient_ID"))
+            if timeline is not None:
+                timeline.remove(row, visit_ordinal(row.get("Visit_time", "")))
+                if not timeline:
+                    self.timelines.pop(row.get("Patient_ID"), None)
+        for note in removed_notes:
+            self.note_index.pop(note.get("Note_ID"), None)
+            for table, key in ((self.visit_notes, note.get("Visit_ID")), (self.patient_notes, note.get("Patient_ID"))):
+                rows = table.get(key, [])
+                rows[:] = [other for other in rows if other is not note]
+                if not rows:
+                    table.pop(key, None)
+
+        if self._aggregates is not None and removed:
+            for row in removed:
+                self._aggregates.remove(row)
+            self._aggregates.save(self.synced_signature)
+        if self._query_engine is not None:
+            for row in removed:
+                self._query_engine.remove(row)
+        if self._cohort_index is not None:
+            for row in removed:
+                self._cohort_index.remove(row)
+        if self._search_index is not None:
+            for note in removed_notes:
+                self._search_index.record_remove(note.get("Note_ID"), self.synced_signature)
+
+    def _id_in_use(self, kind, value):
+        """True if value is held by a record, or by a deleted one still hidden by a tombstone.
+
+        A tombstoned ID must not be handed out again: loads would hide the new
+        record along with the deleted one until the next compaction.
+        """
+        index = self.visit_index if kind == "Visit_ID" else self.note_index
+        if value in index:
+            return True
+        return bool(self.backend) and value in self.backend.deleted.get(kind, ())
+
+    def allocate_ids(self, kind, count=1):
+        """New unused IDs for kind ("Visit_ID" or "Note_ID"), unique across processes.
+
+        IDs already present (e.g. added to the files by another tool) or deleted
+        since the last compaction are skipped.
+        """
+        if count == 1:
+            return [self.id_allocator.allocate(kind)]
+        return self.id_allocator.reserve(kind, count)
 
     def get_all_visits(self):
-        return self.data
\ No newline at end of file
+        return self.data
+
+    def get_columns(self):
+        """Columnar (NumPy) view of the visits for analytics; rebuilt only after the visits change."""
+        with self.lock:
+            if self._columns is None:
+                from visit_analytics import VisitColumns
+                self._columns = VisitColumns(self.data)
+            return self._columns
+
+    def get_aggregates(self):
+        """Per-day/department/complaint/year visit counts, kept current on every add and remove.
+
+        Loaded from the copy saved next to the data when it matches the current files,
+        otherwise rebuilt from the visit columns and saved.
+        """
+        with self.lock:
+            if self._aggregates is None:
+                path = os.path.join(self.backend.data_dir, AGGREGATES_NAME) if self.backend else None
+                if path:
+                    self._aggregates = VisitAggregates.load(path, self.synced_signature)
+                if self._aggregates is None:
+                    self._aggregates = VisitAggregates.from_columns(self.get_columns(), path)
+                    self._aggregates.save(self.synced_signature)
+            return self._aggregates
+
+    def get_query_engine(self):
+        """Sorted date index over the visits (see VisitQueryEngine), kept current on every add and remove."""
+        with self.lock:
+            if self._query_engine is None:
+                self._query_engine = VisitQueryEngine(self.data)
+            return self._query_engine
+
+    def count_visits(self, start=None, end=None, department=None, complaint=None):
+        """Visits dated start..end (inclusive datetime.date bounds), optionally for one department/complaint."""
+        return self.get_query_engine().count(start, end, department, complaint)
+
+    def find_visits(self, start=None, end=None, department=None, complaint=None):
+        """Like count_visits, but returns the visit records in date order."""
+        return list(self.get_query_engine().find(start, end, department, complaint))
+
+    def count_visits_by(self, period, start=None, end=None, department=None, complaint=None):
+        """[(period label, visits)] per "day", "week", "month", "quarter" or "year" within the range."""
+        return self.get_query_engine().count_by(period, start, end, department, complaint)
+
+    def get_cohort_index(self):
+        """Bitmap indexes over the demographic columns (see CohortIndex), kept current on every add and remove."""
+        with self.lock:
+            if self._cohort_index is None:
+                from cohort_index import CohortIndex
+                self._cohort_index = CohortIndex(self.data)
+            return self._cohort_index
+
+    def count_cohort(self, query):
+        """Visits matching e.g. 'Ethnicity=Hispanic AND NOT Insurance=Medicaid'; raises ValueError on bad syntax."""
+        with self.lock:
+            return self.get_cohort_index().count(query)
+
+    def find_cohort(self, query):
+        with self.lock:
+            return self.get_cohort_index().find(query)
+
+    def get_search_index(self):
+        """Full-text index over note text, kept current on every add and remove.
+
+        Loaded from the copy saved next to the data when it matches the current files,
+        otherwise built by tokenizing every note once and saved.
+        """
+        with self.lock:
+            if self._search_index is None:
+                path = os.path.join(self.backend.data_dir, SEARCH_INDEX_NAME) if self.backend else None
+                if path:
+                    self._search_index = NoteSearchIndex.load(path, self.synced_signature)
+                if self._search_index is None:
+                    self._search_index = NoteSearchIndex.build(self.notes, self.get_note_text, path)
+                    self._search_index.save(self.synced_signature)
+            return self._search_index
+
+    def search_notes(self, query, limit=20):
+        """Ranked [(note, score)] for a query; see NoteSearchIndex.search for the syntax."""
+        results = []
+        with self.lock:  # Adds and removals on worker threads update the index in place
+            matches = self.get_search_index().search(query, limit)
+        for note_id, score in matches:
+            note = self.note_index.get(note_id)
+            if note is not None:
+                results.append((note, score))
+        return results
\ No newline at end of file
@@ -1,3 +1,6 @@
+import time
+STARTUP_START = time.perf_counter()  # Startup is measured from here to the login screen being drawn
+
 import tkinter as tk
 from tkinter import messagebox
 from user_auth import UserAuth
@@ -5,13 +8,14 @@ from patient_add import PatientAdd
 from count_manager import CountManager
 from retrieve_patient import RetrievePatient
 from view_notes import ViewNotes
-from graph_utils import GraphGenerator
 from patient_removal import PatientRemoval
-from hospital_database import HospitalDatabase
-from user_tracker import UserActionTracker
+from sqlite_storage import DEFAULT_DB_NAME
+import data_cache
+from user_tracker import UserActionTracker, flush_all
+from task_runner import TaskRunner
+from perf_metrics import metrics, timed, display_dashboard
+from cohort_index import display_cohort_dialog
 import os
-import csv
-from datetime import datetime
 
 class HospitalApp:
     def __init__(self, root):
@@ -23,15 +27,25 @@ class HospitalApp:
         self.data_path = os.path.join(base_dir, "data", "Patient_data.csv")
         self.credentials_path = os.path.join(base_dir, "data", "Credentials.csv")
         self.notes_path = os.path.join(base_dir, "data", "Notes.csv")
+        self.sqlite_path = os.path.join(base_dir, "data", DEFAULT_DB_NAME)
 
         self.user_auth = UserAuth(self.credentials_path)
         self.user_role = None
         self.username = None
+        self.session = None
+
+        # Disk I/O runs on worker threads so the window never stops responding
+        self.runner = TaskRunner(self.root)
+        self.action_buttons = {}
+
+        # Write out queued audit entries before the window goes away
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Shared data (visits and notes, indexed by Patient_ID / Visit_ID / Note_ID).
+        # Runs on the SQLite file once `python sqlite_storage.py migrate` has created it.
+        # Nothing is parsed until a user has logged in (see preload_data).
+        self.db = None
 
-        # Shared data
-        self.data = self.load_csv(self.data_path)
-        self.notes = self.load_csv(self.notes_path)
-        
         self.login_screen()
 
 
@@ -55,6 +69,8 @@ class HospitalApp:
 
         tk.Button(self.root, text="Login", command=self.handle_login).pack(pady=10)
 
+        self.runner.attach_progress(self.root)
+
 
     def center_window(self):
         """Centers the window on the screen based on current size."""
@@ -68,27 +84,57 @@ class HospitalApp:
     def handle_login(self):
         username = self.username_entry.get()
         password = self.password_entry.get()
-        role = self.user_auth.login(username, password)
+        with timed("Login", user=username):
+            self.session = self.user_auth.start_session(username, password)
+        role = self.session.role if self.session else None
 
         action_tracker = UserActionTracker(self.root)
         self.username = username  # Save for tracking
 
         if role:
             self.user_role = role
+            metrics.set_user(username)
             action_tracker.track_action(username, role, "Logged In")
             self.show_role_actions()
+            self.preload_data()
         else:
             action_tracker.track_action(username, "Unknown", "Failed Login")
             messagebox.showerror("Login Failed", "Invalid credentials")
 
 
+    def preload_data(self):
+        """Parse the data in the background after login; notes only for sessions that read them."""
+        read_notes = self.session.can("view")
+
+        def load():
+            db = self.get_db()
+            if read_notes:
+                db.load_notes()
+            return db
+
+        self.runner.submit(load, message="Loading patient data...")
+
     def logout(self, tracker):
         tracker.track_action(self.username, self.user_role, "Logged Out")
+        tracker.flush()
+        metrics.set_user(None)
         self.username = None
         self.user_role = None
+        self.session = None
         self.login_screen() 
     
 
+    def on_close(self):
+        flush_all()
+        self.runner.shutdown()
+        self.root.destroy()
+
+    def action_button(self, text, command):
+        button = tk.Button(self.root, text=text, command=command)
+        button.pack(pady=5)
+        self.action_buttons[text] = button
+        return button
+
     def show_role_actions(self):
         for widget in self.root.winfo_children():
             widget.destroy()
@@ -97,86 +143,151 @@ class HospitalApp:
 
         self.center_window()  # ✅ Center after layout is complete
 
-        db = HospitalDatabase(csv_file=self.data_path, preloaded_data=self.data)
         action_tracker = UserActionTracker(self.root)
-
-        # Display buttons based on role
-        if self.user_role == "management":
-            tk.Label(self.root, text="Management actions available:").pack(pady=5)
-            tk.Button(self.root, text="Hospital Statistics", command=lambda: self.generate_graphs(db, action_tracker)).pack(pady=5)
-            tk.Button(self.root, text="User Actions Log", command=lambda: self.display_user_statistics(action_tracker)).pack(pady=5)
-
-        if self.user_role == "admin":
-            tk.Label(self.root, text="Admin actions available:").pack(pady=5)
-            tk.Button(self.root, text="Count Visits", command=lambda: self.count_visits(db, action_tracker)).pack(pady=5)
-
-        if self.user_role in ["clinician", "nurse"]:
+        self.action_buttons = {}
+
+        # Display the buttons the session's permissions allow
+        actions = [
+            ("statistics", "Hospital Statistics", self.generate_graphs),
+            ("cohort", "Cohort Counts", self.count_cohorts),
+            ("user_log", "User Actions Log", self.display_user_statistics),
+            ("performance", "Performance Dashboard", self.display_performance),
+            ("retrieve", "Retrieve Patient", self.retrieve_patient),
+            ("add", "Add Visit", self.add_visit),
+            ("remove", "Remove Patient", self.remove_patient),
+            ("view", "View Notes", self.view_notes),
+            ("search", "Search Notes", self.search_notes),
+            ("count", "Count Visits", self.count_visits),
+        ]
+        allowed = [(text, action) for mode, text, action in actions if self.session.can(mode)]
+        if allowed:
             tk.Label(self.root, text=f"{self.user_role.title()} actions available:").pack(pady=5)
-            tk.Button(self.root, text="Retrieve Patient", command=lambda: self.retrieve_patient(action_tracker)).pack(pady=5)
-            tk.Button(self.root, text="Add Visit", command=lambda: self.add_visit(action_tracker)).pack(pady=5)
-            tk.Button(self.root, text="Remove Patient", command=lambda: self.remove_patient(action_tracker)).pack(pady=5)
-            tk.Button(self.root, text="View Notes", command=lambda: self.view_notes(action_tracker)).pack(pady=5)
-            tk.Button(self.root, text="Count Visits", command=lambda: self.count_visits(db, action_tracker)).pack(pady=5)
+        for text, action in allowed:
+            self.action_button(text, lambda action=action: action(action_tracker))
 
         tk.Button(self.root, text="Logout", command=lambda: self.logout(action_tracker)).pack(pady=20)
 
+        # Buttons that start another write stay disabled while one is being saved
+        self.runner.register_write_widgets(
+            [self.action_buttons[text] for text in ("Add Visit", "Remove Patient") if text in self.action_buttons])
+        self.runner.attach_progress(self.root)
+
         # Resize and center the window dynamically
         self.root.geometry("")  # Let Tkinter auto-size
         self.center_window()    # Then center it
     
 
     # Action-wrapped functional methods
-    def generate_graphs(self, db, tracker):
+    def generate_graphs(self, tracker):
         tracker.track_action(self.username, self.user_role, "Generated Graphs")
 
-              # Inform the user with the actual folder path
-        today_str = datetime.today().strftime("%m-%d-%Y")
-        folder_name = f"Hospital Statistics {today_str}"
+        start = time.perf_counter()
+
+        def render():
+            from graph_utils import GraphGenerator  # Pulls in matplotlib, so only on first use
 
-        messagebox.showinfo(
-            "Graphs Generated",
-            f"All graphs have been generated and saved in the folder:\n\n{folder_name}"
-        )
-      
-        # Create the graphs and save to the output folder
-        graph_generator = GraphGenerator(db.get_all_visits())
-        graph_generator.generate_all()
+            # Render the graphs headlessly (reusing unchanged ones) and save to the output folder
+            graph_generator = GraphGenerator(self.get_db().get_aggregates())
+            graph_generator.render_all()
+            return graph_generator.output_dir
+
+        def done(folder_name):
+            metrics.record("Hospital Statistics", time.perf_counter() - start)
+            # Inform the user with the actual folder path
+            messagebox.showinfo(
+                "Graphs Generated",
+                f"All graphs have been generated and saved in the folder:\n\n{folder_name}"
+            )
+
+        self.runner.submit(render, on_done=done, disable=[self.action_buttons["Hospital Statistics"]],
+                           message="Generating graphs...")
 
      
+    def count_cohorts(self, tracker):
+        tracker.track_action(self.username, self.user_role, "Counted Cohorts")
+        self.with_db(lambda db: display_cohort_dialog(self.root, db), action="Cohort Counts",
+                     prepare=lambda db: db.get_cohort_index())  # Bitmaps are built off the Tk thread
+
     def display_user_statistics(self, tracker):
         tracker.track_action(self.username, self.user_role, "Viewed User Statistics")
-        tracker.display_action_table()
+        with timed("User Actions Log"):
+            tracker.display_action_table()
+
+    def display_performance(self, tracker):
+        tracker.track_action(self.username, self.user_role, "Viewed Performance Dashboard")
+        display_dashboard(self.root)
 
-    def count_visits(self, db, tracker):
+    def count_visits(self, tracker):
         tracker.track_action(self.username, self.user_role, "Counted Visits")
-        CountManager(db).count_visits_by_date_gui(self.root)
+        self.with_db(lambda db: CountManager(db).count_visits_by_date_gui(self.root), action="Count Visits",
+                     prepare=lambda db: db.get_query_engine())  # Date index is built off the Tk thread
 
     def add_visit(self, tracker):
         tracker.track_action(self.username, self.user_role, "Initiated Add Visit")
-        self.data = self.load_csv(self.data_path)
-        self.notes = self.load_csv(self.notes_path)
-        PatientAdd(self.data, self.notes, self.data_path, self.notes_path, self.root)
+        self.with_db(lambda db: PatientAdd(db, self.root, self.runner), action="Add Visit")
    
     def remove_patient(self, tracker):
         tracker.track_action(self.username, self.user_role, "Opened Patient Removal")
-        self.data = self.load_csv(self.data_path)
-        self.notes = self.load_csv(self.notes_path)
-        PatientRemoval(self.data, self.notes, self.data_path, self.notes_path, self.root)
+        self.with_db(lambda db: PatientRemoval(db, self.root, self.runner), action="Remove Patient")
 
     def retrieve_patient(self, tracker):
         tracker.track_action(self.username, self.user_role, "Retrieved Patient")
-        RetrievePatient(self.root, self.data_path).execute()
+        self.with_db(lambda db: RetrievePatient(self.root, db).execute(), action="Retrieve Patient")
 
     def view_notes(self, tracker):
         tracker.track_action(self.username, self.user_role, "Viewed Notes")
-        ViewNotes(self.root, self.data_path, self.notes_path).execute()
+        self.with_db(lambda db: ViewNotes(self.root, db).execute(), action="View Notes",
+                     prepare=lambda db: db.load_notes())  # Notes are read off the Tk thread
+
+    def search_notes(self, tracker):
+        tracker.track_action(self.username, self.user_role, "Searched Notes")
+
+        def prepare():
+            db = self.get_db()
+            db.get_search_index()  # Built or loaded off the Tk thread on first use
+            return db
+
+        start = time.perf_counter()
+
+        def done(db):
+            metrics.record("Search Notes", time.perf_counter() - start)
+            ViewNotes(self.root, db).search()
+
+        self.runner.submit(prepare, on_done=done, message="Loading note index...")
+
+    def with_db(self, callback, message="Loading patient data...", action=None, prepare=None):
+        """Fetch (and if needed re-parse) the shared database on a worker, then run callback(db) on the Tk thread.
+
+        prepare(db), if given, also runs on the worker (e.g. to build an index first).
+        With action given, the wait from the click until callback starts is recorded
+        in the performance metrics (the dialog the user then fills in is not).
+        """
+        start = time.perf_counter()
+
+        def load():
+            db = self.get_db()
+            if prepare:
+                prepare(db)
+            return db
+
+        def done(db):
+            if action:
+                metrics.record(action, time.perf_counter() - start)
+            callback(db)
+
+        self.runner.submit(load, on_done=done, message=message)
 
-    def load_csv(self, path):
-        with open(path, newline='', encoding='utf-8') as f:
-            return list(csv.DictReader(f))
+    def get_db(self):
+        """Shared, already-parsed database; re-parsed only when the files changed outside the app."""
+        self.db = data_cache.get_database(self.data_path, self.notes_path, self.sqlite_path)
+        return self.db
 
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = HospitalApp(root)
+    root.update_idletasks()
+    startup = time.perf_counter() - STARTUP_START
+    metrics.record("Startup", startup)
+    print(f"Startup: login screen ready after {startup * 1000:.0f} ms.")
     root.mainloop()
\ No newline at end of file
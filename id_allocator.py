@@ -0,0 +1,84 @@
+import json
+import os
+import threading
+from file_lock import FileLock
+
+ALLOCATOR_NAME = "id_allocator.json"
+BLOCK_SIZE = 20        # IDs reserved per trip to the state file for one-at-a-time allocation
+FIRST_ID = 100000      # Start of the ID space
+
+
+class IdAllocator:
+    """Hands out Visit_ID / Note_ID values from a persisted high-water mark.
+
+    The next free value per ID kind lives in data/id_allocator.json and is only
+    advanced under a cross-process file lock, so two workstations never receive
+    the same ID. Without state the mark starts at FIRST_ID; IDs that in_use
+    reports as taken are skipped. Single allocations come from a small block
+    reserved per process; reserve() grabs a whole block for bulk inserts.
+    """
+
+    def __init__(self, path=None, in_use=None):
+        self.path = path
+        self.in_use = in_use or (lambda kind, value: False)  # in_use(kind, "123") -> True if taken
+        self.blocks = {}   # kind -> free IDs of this process's current block, next one last
+        self.memory_state = {}
+        self.thread_lock = threading.Lock()
+
+    def _read_state(self):
+        if not self.path:
+            return self.memory_state
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self, state):
+        if not self.path:
+            self.memory_state = state
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _take(self, kind, count):
+        """Move the persisted high-water mark past the next count free IDs; returns them."""
+        if self.path:
+            with FileLock(self.path + ".lock"):
+                return self._take_locked(kind, count)
+        return self._take_locked(kind, count)
+
+    def _take_locked(self, kind, count):
+        state = self._read_state()
+        value = state.get(kind, FIRST_ID)
+        ids = []
+        # IDs already in use (existing data, deleted records) are stepped over here,
+        # under one lock and one state write, however long the run of them is
+        while len(ids) < count:
+            if not self.in_use(kind, str(value)):
+                ids.append(value)
+            value += 1
+        state[kind] = value
+        self._write_state(state)
+        return ids
+
+    def reserve(self, kind, count):
+        """Reserve count free IDs (as strings) in one locked step, for bulk inserts."""
+        with self.thread_lock:
+            ids = self._take(kind, count)
+        return [str(value) for value in ids]
+
+    def allocate(self, kind):
+        """Next free ID of this kind (as a string), in O(1) from the process's reserved block."""
+        with self.thread_lock:
+            block = self.blocks.setdefault(kind, [])
+            while True:
+                if not block:
+                    block.extend(reversed(self._take(kind, BLOCK_SIZE)))
+                value = str(block.pop())
+                if not self.in_use(kind, value):  # Taken meanwhile by a tool outside the allocator
+                    return value
@@ -0,0 +1,461 @@
+import bisect
+import json
+import math
+import os
+import pickle
+import re
+from array import array
+from collections import Counter
+
+SEARCH_INDEX_NAME = "notes_search_index.bin"
+INDEX_VERSION = 2
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Fold the change log into a fresh snapshot after this many entries
+SNAPSHOT_EVERY = 1000
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def _json_form(value):
+    return json.loads(json.dumps(value))
+
+
+def _starts(counts):
+    """array('Q') of running offsets: [0, c0, c0 + c1, ...]."""
+    import numpy as np
+
+    return array("Q", np.concatenate(([0], np.cumsum(counts, dtype=np.uint64))).astype(np.uint64).tobytes())
+
+
+def _packed(values):
+    """Non-negative integers as an array of the smallest type holding them ('B', 'H' or 'I')."""
+    top = int(values.max()) if len(values) else 0
+    typecode = "B" if top < 1 << 8 else "H" if top < 1 << 16 else "I"
+    return array(typecode, values.astype(typecode).tobytes())
+
+
+def _view(values, start=0, count=-1):
+    """numpy view (no copy) of count items of an array from start."""
+    import numpy as np
+
+    return np.frombuffer(values, dtype=values.typecode, count=count, offset=start * values.itemsize)
+
+
+class NoteSearchIndex:
+    """Inverted index over note text with BM25 ranking, phrase ("...") and prefix (term*) queries.
+
+    Notes are numbered by ordinal. The bulk of the index is a frozen segment
+    of flat arrays: for every term (in sorted order) the ordinals of the notes
+    containing it, how often, and the token positions. Notes added since the
+    segment was written live in a small delta (term -> {ordinal: positions});
+    removed notes are only flagged in `live`. save() merges both into a new
+    segment and writes it as one binary snapshot, and every change in between
+    costs one line in an append-only log that load() replays.
+
+    Searching scores whole posting lists with numpy, using the per-note
+    length normalisation computed once per index state, and skips the full
+    lists of terms that cannot lift a new note into the top results
+    (MaxScore): those terms are only looked up for the current candidates.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        # Frozen segment
+        self.terms = []                 # sorted vocabulary of the segment
+        self.term_ids = {}              # term -> index into terms
+        self.post_start = array("Q", [0])  # term index -> first posting (len(terms) + 1 entries)
+        self.pos_start = array("Q", [0])   # term index -> first position
+        # Postings are stored in the smallest integer type that fits (see _packed)
+        self.docs = array("B")          # posting -> note ordinal (ascending within a term)
+        self.tfs = array("B")           # posting -> term frequency
+        self.positions = array("B")     # token positions, tf of them per posting
+        self.max_tf = array("I")        # term index -> largest tf in its postings
+        # Changes since the segment
+        self.added = {}                 # term -> {ordinal: [positions]}
+        self.added_terms = {}           # ordinal -> its terms, for notes in `added`
+        # Notes by ordinal
+        self.doc_ids = []               # ordinal -> Note_ID
+        self.ordinal = {}               # Note_ID -> ordinal, live notes only
+        self.doc_len = array("I")       # ordinal -> number of tokens
+        self.live = bytearray()         # ordinal -> 1 while the note exists
+        self.live_count = 0
+        self.total_len = 0
+        self.signature = None
+        self.log_entries = 0
+        self._vocabulary = None  # Sorted terms for prefix lookups, rebuilt on demand
+        self._norms = None       # (state, per-ordinal BM25 length normalisation)
+
+    @property
+    def log_path(self):
+        return self.path + ".log" if self.path else None
+
+    @classmethod
+    def build(cls, notes, text_for, path=None):
+        """Tokenize every note; text_for(note) returns its Note_text."""
+        index = cls(path)
+        for note in notes:
+            index.add(note.get("Note_ID"), text_for(note))
+        index._freeze()
+        return index
+
+    def add(self, note_id, text):
+        self._add_positions(note_id, self._positions(tokenize(text)))
+
+    def _positions(self, tokens):
+        positions = {}
+        for pos, term in enumerate(tokens):
+            positions.setdefault(term, []).append(pos)
+        return positions
+
+    def _add_positions(self, note_id, positions):
+        if note_id in self.ordinal:
+            self.remove(note_id)
+        ordinal = len(self.doc_ids)
+        length = 0
+        for term, term_positions in positions.items():
+            if term not in self.added and term not in self.term_ids:
+                self._vocabulary = None
+            self.added.setdefault(term, {})[ordinal] = term_positions
+            length += len(term_positions)
+        self.added_terms[ordinal] = list(positions)
+        self.doc_ids.append(note_id)
+        self.ordinal[note_id] = ordinal
+        self.doc_len.append(length)
+        self.live.append(1)
+        self.live_count += 1
+        self.total_len += length
+        self._norms = None
+        return positions
+
+    def remove(self, note_id):
+        ordinal = self.ordinal.pop(note_id, None)
+        if ordinal is None:
+            return
+        self.live[ordinal] = 0
+        self.live_count -= 1
+        self.total_len -= self.doc_len[ordinal]
+        self._norms = None
+        for term in self.added_terms.pop(ordinal, []):
+            docs = self.added[term]
+            del docs[ordinal]
+            if not docs:
+                del self.added[term]
+                self._vocabulary = None
+
+    def _freeze(self):
+        """Merge the delta into the segment, drop removed notes and renumber the ordinals."""
+        import numpy as np
+
+        if not self.added and self.live_count == len(self.doc_ids):
+            return  # Already a single segment
+
+        live = np.frombuffer(bytes(self.live), dtype=np.uint8).astype(bool)
+        renumber = np.cumsum(live, dtype=np.int64) - 1  # old ordinal -> new ordinal (for live notes)
+
+        # Postings of the segment and of the delta as parallel arrays: term, ordinal, tf, first position
+        seg_counts = np.diff(np.frombuffer(self.post_start, dtype=np.uint64)).astype(np.int64)
+        seg_terms = np.repeat(np.arange(len(self.terms), dtype=np.int64), seg_counts)
+        seg_docs = _view(self.docs).astype(np.int64)
+        seg_tfs = _view(self.tfs).astype(np.int64)
+        seg_pos = _view(self.positions).astype(np.uint32)
+        seg_first = np.concatenate(([0], np.cumsum(seg_tfs)[:-1])) if len(seg_tfs) else seg_tfs
+
+        vocabulary = sorted(set(self.terms) | set(self.added))
+        new_id = {term: i for i, term in enumerate(vocabulary)}
+        seg_map = np.array([new_id[term] for term in self.terms], dtype=np.int64)
+
+        add_terms, add_docs, add_tfs, add_pos = [], [], [], []
+        for term, docs in self.added.items():
+            term_id = new_id[term]
+            for ordinal, term_positions in docs.items():
+                add_terms.append(term_id)
+                add_docs.append(ordinal)
+                add_tfs.append(len(term_positions))
+                add_pos.extend(term_positions)
+        add_tfs = np.array(add_tfs, dtype=np.int64)
+
+        terms = np.concatenate((seg_map[seg_terms], np.array(add_terms, dtype=np.int64)))
+        docs = np.concatenate((seg_docs, np.array(add_docs, dtype=np.int64)))
+        tfs = np.concatenate((seg_tfs, add_tfs))
+        pos = np.concatenate((seg_pos, np.array(add_pos, dtype=np.uint32)))
+        first = np.concatenate((seg_first, len(seg_pos) + np.concatenate(([0], np.cumsum(add_tfs)[:-1]))
+                                if len(add_tfs) else add_tfs))
+
+        keep = live[docs] if len(docs) else np.zeros(0, dtype=bool)
+        terms, docs, tfs, first = terms[keep], renumber[docs[keep]], tfs[keep], first[keep]
+        order = np.lexsort((docs, terms))
+        terms, docs, tfs, first = terms[order], docs[order], tfs[order], first[order]
+        # Gather each posting's positions in the new order
+        new_first = np.concatenate(([0], np.cumsum(tfs)[:-1])) if len(tfs) else tfs
+        gather = np.repeat(first - new_first, tfs) + np.arange(int(tfs.sum()), dtype=np.int64)
+        pos = pos[gather]
+
+        counts = np.bincount(terms, minlength=len(vocabulary))
+        used = counts > 0
+        self.terms = [term for term, keep_term in zip(vocabulary, used) if keep_term]
+        self.term_ids = {term: i for i, term in enumerate(self.terms)}
+        counts = counts[used]
+        self.post_start = _starts(counts)
+        self.pos_start = _starts(np.add.reduceat(tfs, np.frombuffer(self.post_start, dtype=np.uint64)[:-1]
+                                                  .astype(np.int64)) if len(tfs) else counts)
+        self.docs = _packed(docs)
+        self.tfs = _packed(tfs)
+        self.positions = _packed(pos)
+        self.max_tf = array("I", (np.maximum.reduceat(tfs, np.frombuffer(self.post_start, dtype=np.uint64)[:-1]
+                                                       .astype(np.int64)) if len(tfs) else counts)
+                            .astype(np.uint32).tobytes())
+
+        self.doc_ids = [note_id for note_id, alive in zip(self.doc_ids, self.live) if alive]
+        self.ordinal = {note_id: i for i, note_id in enumerate(self.doc_ids)}
+        self.doc_len = array("I", np.frombuffer(self.doc_len, dtype=np.uint32)[live].tobytes())
+        self.live = bytearray(b"\x01") * len(self.doc_ids)
+        self.added, self.added_terms = {}, {}
+        self._vocabulary = None
+        self._norms = None
+
+    # ---- persistence -------------------------------------------------------
+
+    @classmethod
+    def load(cls, path, signature):
+        """Read the snapshot and replay its log; None if missing or not matching the current data."""
+        try:
+            with open(path, "rb") as f:
+                saved = pickle.load(f)
+            if saved.get("version") != INDEX_VERSION:
+                return None
+        except (OSError, EOFError, AttributeError, pickle.UnpicklingError):
+            return None
+
+        index = cls(path)
+        for name in ("terms", "post_start", "pos_start", "docs", "tfs", "positions", "max_tf", "doc_ids", "doc_len"):
+            setattr(index, name, saved[name])
+        index.term_ids = {term: i for i, term in enumerate(index.terms)}
+        index.ordinal = {note_id: i for i, note_id in enumerate(index.doc_ids)}
+        index.live = bytearray(b"\x01") * len(index.doc_ids)
+        index.live_count = len(index.doc_ids)
+        index.total_len = sum(index.doc_len)
+        index.signature = saved["signature"]
+
+        if os.path.exists(index.log_path):
+            with open(index.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Torn last line from a crash; what follows it is unusable
+                    if entry["op"] == "add":
+                        index._add_positions(entry["id"], entry["positions"])
+                    else:
+                        index.remove(entry["id"])
+                    index.signature = entry["signature"]
+                    index.log_entries += 1
+
+        if index.signature != _json_form(signature):
+            return None
+        return index
+
+    def save(self, signature):
+        """Write a full snapshot and clear the change log."""
+        self._freeze()
+        self.signature = _json_form(signature)
+        self.log_entries = 0
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        saved = {name: getattr(self, name) for name in
+                 ("terms", "post_start", "pos_start", "docs", "tfs", "positions", "max_tf", "doc_ids", "doc_len")}
+        saved.update(version=INDEX_VERSION, signature=self.signature)
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(saved, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+        except OSError as e:
+            print(f"Error saving note search index: {e}")
+
+    def record_add(self, note_id, text, signature):
+        """Index a new note and append the change to the log."""
+        positions = self._add_positions(note_id, self._positions(tokenize(text)))
+        self._log({"op": "add", "id": note_id, "positions": positions}, signature)
+
+    def record_remove(self, note_id, signature):
+        self.remove(note_id)
+        self._log({"op": "remove", "id": note_id}, signature)
+
+    def _log(self, entry, signature):
+        self.signature = _json_form(signature)
+        if not self.path:
+            return
+        self.log_entries += 1
+        if self.log_entries >= SNAPSHOT_EVERY:
+            self.save(signature)
+            return
+        entry["signature"] = self.signature
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print(f"Error saving note search index: {e}")
+
+    # ---- querying ----------------------------------------------------------
+
+    def expand_prefix(self, prefix):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(set(self.terms) | set(self.added))
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def _df(self, term, live):
+        """Number of live notes containing term."""
+        if self.live_count == len(self.doc_ids):  # Nothing removed since the snapshot: count the postings
+            term_id = self.term_ids.get(term)
+            df = self.post_start[term_id + 1] - self.post_start[term_id] if term_id is not None else 0
+            return df + len(self.added.get(term, ()))
+        return int(live[self._postings(term)[0]].sum())
+
+    def _postings(self, term):
+        """(ordinals, tfs) for term, ordinals ascending; the segment part is a view, not a copy."""
+        import numpy as np
+
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            docs = tfs = np.zeros(0, dtype=np.uint32)
+        else:
+            start, count = self.post_start[term_id], self.post_start[term_id + 1] - self.post_start[term_id]
+            docs = _view(self.docs, start, count)
+            tfs = _view(self.tfs, start, count)
+        added = self.added.get(term)
+        if added:  # Ordinals added since the segment are all larger, so order is kept
+            docs = np.concatenate((docs, np.fromiter(added, dtype=np.uint32, count=len(added))))
+            tfs = np.concatenate((tfs, np.fromiter(map(len, added.values()), dtype=np.uint32, count=len(added))))
+        return docs, tfs
+
+    def _term_positions(self, term):
+        """(ordinal, position) of every occurrence of term."""
+        import numpy as np
+
+        docs, tfs = self._postings(term)
+        term_id = self.term_ids.get(term)
+        parts = []
+        if term_id is not None:
+            start, end = self.pos_start[term_id], self.pos_start[term_id + 1]
+            parts.append(_view(self.positions, start, end - start))
+        for term_positions in self.added.get(term, {}).values():
+            parts.append(np.array(term_positions, dtype=np.uint32))
+        positions = np.concatenate(parts) if parts else np.zeros(0, dtype=np.uint32)
+        return np.repeat(docs, tfs).astype(np.int64), positions.astype(np.int64)
+
+    def _phrase_matches(self, terms):
+        """Ordinals of the notes containing the terms consecutively."""
+        import numpy as np
+
+        keys = None
+        for offset, term in enumerate(terms):
+            docs, positions = self._term_positions(term)
+            start = positions >= offset
+            # One int per occurrence: note ordinal and the position the phrase would start at
+            term_keys = (docs[start] << 32) | (positions[start] - offset)
+            keys = term_keys if keys is None else np.intersect1d(keys, term_keys)
+            if not len(keys):
+                break
+        return np.unique(keys >> 32) if keys is not None else np.zeros(0, dtype=np.int64)
+
+    def _norm_array(self):
+        """K1 * (1 - B + B * len / avg_len) per ordinal, recomputed only after the index changes."""
+        import numpy as np
+
+        state = (len(self.doc_ids), self.live_count, self.total_len)
+        if self._norms is None or self._norms[0] != state:
+            avg_len = self.total_len / self.live_count if self.live_count else 1
+            doc_len = np.frombuffer(self.doc_len, dtype=np.uint32).astype(np.float64)
+            self._norms = (state, K1 * (1 - B + B * doc_len / (avg_len or 1)))
+        return self._norms[1]
+
+    def search(self, query, limit=20):
+        """Return [(Note_ID, score)] best first.
+
+        Quoted phrases must all match; other words (with a trailing * for prefix
+        matching) rank the results with BM25.
+        """
+        import numpy as np
+
+        phrases = []
+        terms = []
+        for phrase, word in QUERY_RE.findall(query.lower()):
+            if phrase:
+                phrases.append(tokenize(phrase))
+            elif word.endswith("*") and tokenize(word[:-1]):
+                terms.extend(self.expand_prefix(tokenize(word[:-1])[0]))
+            else:
+                terms.extend(tokenize(word))
+        if not self.live_count:
+            return []
+
+        live = np.frombuffer(bytes(self.live), dtype=np.uint8).astype(bool)
+        allowed = live.copy()
+        for phrase in phrases:
+            mask = np.zeros(len(allowed), dtype=bool)
+            mask[self._phrase_matches(phrase)] = True
+            allowed &= mask
+            terms.extend(phrase)
+
+        norms = self._norm_array()
+        min_norm = norms[allowed].min() if allowed.any() else K1
+        n = self.live_count
+        plan = []  # (upper bound of the term's contribution, weight * idf, term)
+        for term, weight in Counter(terms).items():
+            df = self._df(term, live)
+            if not df:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            term_id = self.term_ids.get(term)
+            max_tf = max(([self.max_tf[term_id]] if term_id is not None else [])
+                         + [len(p) for p in self.added.get(term, {}).values()])
+            plan.append((weight * idf * max_tf * (K1 + 1) / (max_tf + min_norm), weight * idf, term))
+        plan.sort(reverse=True)
+
+        candidates = np.zeros(0, dtype=np.int64)
+        scores = np.zeros(0, dtype=np.float64)
+        for i, (_, factor, term) in enumerate(plan):
+            remaining = sum(upper for upper, _, _ in plan[i:])
+            threshold = np.partition(scores, -limit)[-limit] if len(scores) >= limit else 0
+            docs, tfs = self._postings(term)
+            if threshold > 0 and threshold >= remaining:
+                # Notes not seen yet cannot reach the top results: only update the candidates
+                keep = scores + remaining >= threshold
+                candidates, scores = candidates[keep], scores[keep]
+                at = np.minimum(np.searchsorted(docs, candidates), max(len(docs) - 1, 0))
+                hit = docs[at] == candidates if len(docs) else np.zeros(len(candidates), dtype=bool)
+                tf = tfs[at[hit]].astype(np.float64)
+                scores[hit] += factor * tf * (K1 + 1) / (tf + norms[candidates[hit]])
+                continue
+            keep = allowed[docs]
+            docs, tf = docs[keep].astype(np.int64), tfs[keep].astype(np.float64)
+            term_scores = factor * tf * (K1 + 1) / (tf + norms[docs])
+            if not len(candidates):
+                candidates, scores = docs, term_scores
+            else:
+                candidates, inverse = np.unique(np.concatenate((candidates, docs)), return_inverse=True)
+                scores = np.bincount(inverse, weights=np.concatenate((scores, term_scores)))
+
+        if not len(scores):
+            return []
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return [(self.doc_ids[candidates[i]], float(scores[i])) for i in order]
\ No newline at end of file
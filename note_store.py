@@ -0,0 +1,135 @@
+import csv
+import io
+import os
+from csv_snapshot import SnapshotCache, LoadedPrefix
+
+NOTE_KEY_FIELDS = ["", "Patient_ID", "Visit_ID", "Note_ID"]
+
+
+class NoteStore:
+    """Compact index over Notes.csv: note IDs in memory, note text left on disk.
+
+    scan() walks the file once and records, for every note, its Patient_ID,
+    Visit_ID and Note_ID plus the byte offset and length of its CSV record.
+    read_text() seeks straight to that record when a note is actually shown.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.locations = {}   # Note_ID -> (byte offset, byte length) of the CSV record
+        self.scanned_to = 0   # File offset up to which records have been indexed
+        self.prefix = None    # Fingerprint of those bytes (LoadedPrefix)
+        self._file = None     # Open only while iter_full_rows() reads every note
+
+    def scan(self):
+        """Index the whole file; returns one metadata dict (no Note_text) per note.
+
+        The index is kept in a snapshot next to the file, so an unchanged file is
+        not walked again and an appended one is walked only from the old end.
+        """
+        self.close()
+        self.prefix = None
+        cache = SnapshotCache(self.path)
+        cached = cache.load() if os.path.exists(self.path) else None
+        if cached is None:
+            self.locations = {}
+            self.scanned_to = 0
+            notes = self.scan_tail()
+        else:
+            (notes, self.locations), self.scanned_to = cached
+            tail = self.scan_tail()
+            notes.extend(tail)
+        if os.path.exists(self.path) and (cached is None or tail):
+            cache.save((notes, self.locations), self.scanned_to)
+        self.prefix = LoadedPrefix.from_snapshot(cache, self.scanned_to)
+        return notes
+
+    def unchanged(self):
+        """True if the records indexed so far are still in the file as they were (it was at most appended to)."""
+        return self.prefix is None or self.prefix.unchanged()
+
+    def scan_tail(self):
+        """Index records appended since the last scan; returns their metadata dicts."""
+        notes = []
+        if not os.path.exists(self.path):
+            return notes
+
+        with open(self.path, "rb") as f:
+            f.seek(self.scanned_to)
+            offset = self.scanned_to
+            record = b""
+            start = offset
+            for line in f:
+                if not record:
+                    start = offset
+                record += line
+                offset += len(line)
+                # A record ends on a line break outside quotes ("" escapes keep the count even)
+                if record.count(b'"') % 2:
+                    continue
+                if start == 0:
+                    record = b""  # Header row
+                    continue
+                note = self._parse_keys(record)
+                if note is not None:
+                    self.locations[note["Note_ID"]] = (start, len(record))
+                    notes.append(note)
+                record = b""
+            # A trailing partial record (no closing quote yet) is left for the next scan
+            self.scanned_to = offset - len(record)
+        if self.prefix is not None:
+            self.prefix.extend_to(self.scanned_to)
+        return notes
+
+    def _parse_keys(self, record):
+        prefix = record.split(b",", 4)
+        if len(prefix) == 5 and b'"' not in b"".join(prefix[:4]):
+            values = [p.decode("utf-8") for p in prefix[:4]]
+        else:
+            row = self._parse_record(record)
+            if len(row) < 4:
+                return None
+            values = row[:4]
+        return dict(zip(NOTE_KEY_FIELDS, values))
+
+    def _parse_record(self, record):
+        rows = list(csv.reader(io.StringIO(record.decode("utf-8"), newline="")))
+        return rows[0] if rows else []
+
+    def read_text(self, note):
+        """Load one note's Note_text from disk.
+
+        The file is opened for this one read, so no handle stays open that
+        would stop another process from replacing Notes.csv (on Windows).
+        """
+        location = self.locations.get(note.get("Note_ID"))
+        if location is None:
+            return ""
+        if self._file is not None:
+            return self._read_record(self._file, location)
+        with open(self.path, "rb") as f:
+            return self._read_record(f, location)
+
+    def _read_record(self, f, location):
+        offset, length = location
+        f.seek(offset)
+        row = self._parse_record(f.read(length))
+        return row[4] if len(row) > 4 else ""
+
+    def iter_full_rows(self, notes):
+        """Yield complete note rows (text read back from disk), e.g. for rewriting the file."""
+        self.close()
+        self._file = open(self.path, "rb") if os.path.exists(self.path) else None  # One handle for the whole pass
+        try:
+            for note in notes:
+                row = {key: note.get(key, "") for key in NOTE_KEY_FIELDS}
+                row["Note_text"] = note["Note_text"] if "Note_text" in note else self.read_text(note)
+                yield row
+        finally:
+            # Release the old file before it gets replaced
+            self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
\ No newline at end of file
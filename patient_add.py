@@ -1,9 +1,6 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import random
 from datetime import datetime
-import csv
-import os
 
 def center_toplevel(window):
     window.update_idletasks()
@@ -16,12 +13,10 @@ def center_toplevel(window):
     window.geometry(f"{w}x{h}+{x}+{y}")
 
 class PatientAdd:
-    def __init__(self, database, notes_db, data_path, notes_path, parent):
-        self.db = database
-        self.notes_db = notes_db
-        self.data_path = data_path
-        self.notes_path = notes_path
+    def __init__(self, database, parent, runner=None):
+        self.db = database  # HospitalDatabase holding both visits and notes
         self.parent = parent
+        self.runner = runner  # TaskRunner for saving off the Tk thread (None saves inline)
         self.latest_visit_data = {}
 
         self.add_window = tk.Toplevel(parent)
@@ -49,12 +44,8 @@ class PatientAdd:
             return
 
         self.patient_id_str = pid
-        existing_ids = {record["Patient_ID"] for record in self.db}
-
-        if pid in existing_ids:
-            patient_visits = [rec for rec in self.db if rec["Patient_ID"] == pid]
-            patient_visits.sort(key=lambda x: datetime.strptime(x["Visit_time"], "%m/%d/%Y"), reverse=True)
-            self.latest_visit_data = patient_visits[0] if patient_visits else {}
+        if self.db.has_patient(pid):
+            self.latest_visit_data = self.db.get_latest_visit(pid) or {}
             self.create_visit_form()
         else:
             proceed = messagebox.askyesno("New Patient", f"Patient ID '{pid}' does not exist. Create new patient?")
@@ -91,17 +82,12 @@ class PatientAdd:
             entry.insert(0, default)
             setattr(self, attr, entry)
 
-        ttk.Button(self.add_window, text="Add Visit", command=self.add_visit).grid(row=len(fields), column=0, columnspan=2, pady=10)
+        self.add_button = ttk.Button(self.add_window, text="Add Visit", command=self.add_visit)
+        self.add_button.grid(row=len(fields), column=0, columnspan=2, pady=10)
         self.add_window.grid_columnconfigure(1, weight=1)
 
         center_toplevel(self.add_window)
    
-    def generate_unique_id(self, existing_ids_set):
-        while True:
-            new_id = str(random.randint(100000, 999999))
-            if new_id not in existing_ids_set:
-                return new_id
-
     def add_visit(self):
         pid = self.patient_id_str
         if not pid:
@@ -118,14 +104,9 @@ class PatientAdd:
         if not messagebox.askyesno("Confirm", f"Add visit for Patient ID '{pid}'?"):
             return
 
-        visit_ids = {rec["Visit_ID"] for rec in self.db}
-        note_ids = {note["Note_ID"] for note in self.notes_db}
-        visit_id = self.generate_unique_id(visit_ids)
-        note_id = self.generate_unique_id(note_ids)
-
         visit_record = {
             "Patient_ID": pid,
-            "Visit_ID": visit_id,
+            "Visit_ID": "",  # IDs are filled in by save()
             "Visit_time": formatted_date,
             "Visit_department": self.department_entry.get().strip(),
             "Race": self.race_entry.get().strip(),
@@ -135,48 +116,43 @@ class PatientAdd:
             "Zip_code": self.zip_code_entry.get().strip(),
             "Insurance": self.insurance_entry.get().strip(),
             "Chief_complaint": self.chief_complaint_entry.get().strip(),
-            "Note_ID": note_id,
+            "Note_ID": "",
             "Note_type": self.note_type_entry.get().strip(),
         }
 
-        note_text = self.note_text_entry.get().strip()
+        note_record = {
+            "": "",  # Index column, filled in by save()
+            "Patient_ID": pid,
+            "Visit_ID": "",
+            "Note_ID": "",
+            "Note_text": self.note_text_entry.get().strip()
+        }
 
-        try:
-            self.db.append(visit_record)
-            self.notes_db.append({
-                "": str(len(self.notes_db) + 1),  # Index column
-                "Patient_ID": pid,
-                "Visit_ID": visit_id,
-                "Note_ID": note_id,
-                "Note_text": note_text
-            })
-            self.save_visit()
-            self.save_notes()
+        def save():
+            # Runs on the worker: allocating IDs takes the allocator's file lock, and
+            # counting the notes may load them (lazy_notes) or wait for the preload
+            note_record[""] = str(len(self.db.notes) + 1)
+            visit_id, = self.db.allocate_ids("Visit_ID")
+            note_id, = self.db.allocate_ids("Note_ID")
+            visit_record["Visit_ID"] = note_record["Visit_ID"] = visit_id
+            visit_record["Note_ID"] = note_record["Note_ID"] = note_id
+            self.db.add_visit_record(visit_record, note_record)
+
+        def saved(_):
             messagebox.showinfo("Success", "Visit and note added.")
             self.add_window.destroy()
-        except Exception as e:
+
+        def failed(e):
             messagebox.showerror("Error", f"Could not save visit or note: {e}")
 
-    def save_visit(self):
-        if not self.db:
+        # Both rows are appended to the end of the files in one journaled commit
+        if self.runner:
+            self.runner.submit(save, on_done=saved, on_error=failed, disable=[self.add_button],
+                               message="Saving visit...", write=True)
             return
-        fieldnames = self.db[0].keys()
-        with open(self.data_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(self.db)
-
-    def save_notes(self):
-        if not self.notes_db:
+        try:
+            save()
+        except Exception as e:
+            failed(e)
             return
-
-        # Reindex all notes sequentially
-        for idx, note in enumerate(self.notes_db, start=1):
-            note[""] = str(idx)  # Set the placeholder index
-
-        fieldnames = ["", "Patient_ID", "Visit_ID", "Note_ID", "Note_text"]
-
-        with open(self.notes_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(self.notes_db)
\ No newline at end of file
+        saved(None)
\ No newline at end of file
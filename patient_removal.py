@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import csv
 
 def center_toplevel(window):
     window.update_idletasks()
@@ -13,12 +12,10 @@ def center_toplevel(window):
     window.geometry(f"{w}x{h}+{x}+{y}")
 
 class PatientRemoval:
-    def __init__(self, patient_data, notes_data, data_path, notes_path, parent):
-        self.patient_data = patient_data
-        self.notes_data = notes_data
-        self.data_path = data_path
-        self.notes_path = notes_path
+    def __init__(self, database, parent, runner=None):
+        self.db = database  # HospitalDatabase holding both visits and notes
         self.parent = parent
+        self.runner = runner  # TaskRunner for saving off the Tk thread (None saves inline)
 
         # Create a new window or frame for patient removal
         self.remove_window = tk.Toplevel(parent)
@@ -46,9 +43,7 @@ class PatientRemoval:
             return
 
         # Check if the patient ID exists in the visit records
-        patient_found = any(record['Patient_ID'] == patient_id for record in self.patient_data)
-
-        if not patient_found:
+        if not self.db.has_patient(patient_id):
             messagebox.showerror("Error", f"No patient found with ID {patient_id}.")
             return
 
@@ -59,45 +54,21 @@ class PatientRemoval:
             self.remove_window.destroy()  # Close the window after cancellation
             return
 
-        # Remove patient visit records (only those related to this patient)
-        self.patient_data = [record for record in self.patient_data if record['Patient_ID'] != patient_id]
-    
-        # Remove notes related to the patient (only those related to this patient)
-        self.notes_data = [note for note in self.notes_data if note['Patient_ID'] != patient_id]
-
-        # ✅ Reindex the notes
-        for i, note in enumerate(self.notes_data, start=1):
-            note[""] = str(i)
-        
-        # Save changes
-        self.save_to_file(self.patient_data, self.data_path)
-        self.save_to_file(self.notes_data, self.notes_path)
+        def removed(_):
+            messagebox.showinfo("Success", f"Patient ID {patient_id} and related visits/notes successfully removed.")
+            self.remove_window.destroy()  # Close the window after successful removal
 
-        messagebox.showinfo("Success", f"Patient ID {patient_id} and related visits/notes successfully removed.")
-        self.remove_window.destroy()  # Close the window after successful removal
+        def failed(e):
+            messagebox.showerror("Error", f"Removing Patient ID {patient_id} failed: {e}")
 
-    def save_to_file(self, data, file_name):
-        """Helper function to save data back to a CSV file."""
+        # Remove the patient's visits and notes; the storage backend persists the delete
+        if self.runner:
+            self.runner.submit(self.db.remove_patient, patient_id, on_done=removed, on_error=failed,
+                               disable=[self.remove_button], message="Removing patient...", write=True)
+            return
         try:
-            with open(file_name, 'w', encoding='utf-8', errors='replace', newline='') as file:
-                if not data:
-                    # Handle empty file with no data rows
-                    file.truncate()
-                    print(f"'{file_name}' emptied successfully (no remaining records).")
-                    return
-
-                writer = csv.DictWriter(file, fieldnames=data[0].keys())
-                writer.writeheader()
-                writer.writerows(data)
-                print(f"Database '{file_name}' updated successfully.")
-        except FileNotFoundError:
-            print(f"Error: The file '{file_name}' was not found.")
-        except IOError as e:
-            print(f"An error occurred while saving '{file_name}': {e}")
-
-    def reload_data(self):
-        with open(self.data_path, newline='', encoding='utf-8') as f:
-            self.patient_data[:] = list(csv.DictReader(f))
-
-        with open(self.notes_path, newline='', encoding='utf-8') as f:
-            self.notes_data[:] = list(csv.DictReader(f))
\ No newline at end of file
+            self.db.remove_patient(patient_id)
+        except Exception as e:
+            failed(e)
+            return
+        removed(None)
\ No newline at end of file
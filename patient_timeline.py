@@ -0,0 +1,43 @@
+from bisect import bisect_left, bisect_right
+
+UNDATED = 0  # Sort key for visits whose Visit_time cannot be parsed (before every real date)
+
+
+class PatientTimeline:
+    """One patient's visits kept in date order, with the parsed day number of each.
+
+    Visits on the same day stay in the order they were added (file order), so
+    latest() is the last visit of the most recent day. add()/remove() keep the
+    order with a binary search; reading never parses or sorts.
+    """
+
+    __slots__ = ("days", "visits")
+
+    def __init__(self):
+        self.days = []    # date ordinals, ascending
+        self.visits = []  # visit rows, parallel to days
+
+    def add(self, visit, day):
+        day = UNDATED if day is None else day
+        index = bisect_right(self.days, day)
+        self.days.insert(index, day)
+        self.visits.insert(index, visit)
+
+    def remove(self, visit, day):
+        day = UNDATED if day is None else day
+        for index in range(bisect_left(self.days, day), bisect_right(self.days, day)):
+            if self.visits[index] is visit:
+                del self.days[index]
+                del self.visits[index]
+                return True
+        return False
+
+    def latest(self):
+        return self.visits[-1] if self.visits else None
+
+    def history(self):
+        """All visits, oldest first."""
+        return list(self.visits)
+
+    def __len__(self):
+        return len(self.visits)
\ No newline at end of file
@@ -0,0 +1,165 @@
+import os
+import csv
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Upper bounds (ms) of the histogram buckets; the last bucket takes everything slower
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+WINDOW = 512  # Most recent samples per series kept for percentiles
+ALL_USERS = ""
+EXPORT_HEADER = ["User", "Action", "Count", "Mean (ms)", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Max (ms)"] + \
+                [f"<= {bound} ms" for bound in BUCKETS_MS] + [f"> {BUCKETS_MS[-1]} ms"]
+
+
+class LatencySeries:
+    """Counter plus latency histogram for one action: all-time buckets, percentiles over the latest WINDOW calls."""
+
+    __slots__ = ("count", "total", "max", "buckets", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.recent = deque(maxlen=WINDOW)
+
+    def record(self, ms):
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.recent.append(ms)
+
+    def summary(self):
+        recent = sorted(self.recent)
+
+        def pct(p):
+            return recent[min(len(recent) - 1, int(p / 100.0 * len(recent)))] if recent else 0.0
+
+        return {"count": self.count, "mean_ms": self.total / self.count if self.count else 0.0,
+                "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99), "max_ms": self.max,
+                "buckets": list(self.buckets)}
+
+
+class Metrics:
+    """Process-wide latency recorder for user actions and the I/O steps inside them.
+
+    Each sample costs two perf_counter() calls and a dict lookup, so the hooks
+    stay enabled in production. Samples are kept per action for all users and
+    per (user, action); the user is whoever is logged in (set_user) unless
+    one is passed explicitly.
+    """
+
+    def __init__(self):
+        self.series = {}  # (username or ALL_USERS, action) -> LatencySeries
+        self.lock = threading.Lock()
+        self.current_user = None
+
+    def set_user(self, username):
+        self.current_user = username
+
+    def record(self, action, seconds, user=None):
+        user = user or self.current_user
+        ms = seconds * 1000.0
+        with self.lock:
+            for key in ((ALL_USERS, action), (user, action)) if user else ((ALL_USERS, action),):
+                series = self.series.get(key)
+                if series is None:
+                    series = self.series[key] = LatencySeries()
+                series.record(ms)
+
+    @contextmanager
+    def timed(self, action, user=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(action, time.perf_counter() - start, user)
+
+    def snapshot(self, by_user=False):
+        """Rows of {user, action, count, mean_ms, p50_ms, ...}: per action, or per user and action."""
+        with self.lock:
+            items = [(key, series.summary()) for key, series in self.series.items()
+                     if (key[0] != ALL_USERS) == by_user]
+        rows = [dict(summary, user=user, action=action) for (user, action), summary in items]
+        rows.sort(key=lambda row: (row["user"], row["action"]))
+        return rows
+
+    def export_csv(self, path):
+        """Write per-action and per-user statistics with their histograms to a CSV file."""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_HEADER)
+            for row in self.snapshot() + self.snapshot(by_user=True):
+                writer.writerow([row["user"] or "(all)", row["action"], row["count"]] +
+                                [f"{row[key]:.2f}" for key in ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")] +
+                                row["buckets"])
+        return path
+
+    def reset(self):
+        with self.lock:
+            self.series = {}
+
+
+# Shared by every module in the process
+metrics = Metrics()
+
+
+def timed(action, user=None):
+    """Context manager that records how long its block takes under `action`."""
+    return metrics.timed(action, user)
+
+
+def display_dashboard(root):
+    """Management panel: latency per action (or per user) with an export to CSV."""
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+
+    top = tk.Toplevel(root)
+    top.title("Performance Dashboard")
+    top.geometry("820x420")
+
+    columns = ["User", "Action", "Count", "Mean (ms)", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Max (ms)"]
+    by_user = tk.BooleanVar(value=False)
+
+    controls = ttk.Frame(top)
+    controls.pack(fill=tk.X, padx=10, pady=(10, 0))
+
+    tree_frame = ttk.Frame(top)
+    tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+    tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
+    scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    scrollbar.pack(side="right", fill="y")
+    tree.pack(side="left", fill=tk.BOTH, expand=True)
+    for col in columns:
+        tree.heading(col, text=col)
+        tree.column(col, width=170 if col == "Action" else 80, anchor="w" if col in ("User", "Action") else "e")
+
+    def refresh():
+        tree.delete(*tree.get_children())
+        for row in metrics.snapshot(by_user=by_user.get()):
+            tree.insert("", "end", values=[row["user"] or "(all)", row["action"], row["count"]] +
+                        [f"{row[key]:.1f}" for key in ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")])
+
+    def export():
+        today_str = datetime.today().strftime("%m-%d-%Y")
+        output_dir = f"Performance Statistics {today_str}"
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, f"performance_{datetime.now().strftime('%m%d%Y_%H%M%S')}.csv")
+        try:
+            metrics.export_csv(path)
+        except OSError as e:
+            messagebox.showerror("Export Failed", f"Could not export the statistics: {e}", parent=top)
+            return
+        messagebox.showinfo("Exported", f"Statistics exported to:\n\n{path}", parent=top)
+
+    ttk.Checkbutton(controls, text="Per user", variable=by_user, command=refresh).pack(side="left")
+    ttk.Button(controls, text="Refresh", command=refresh).pack(side="left", padx=5)
+    ttk.Button(controls, text="Export", command=export).pack(side="left")
+    refresh()
\ No newline at end of file
@@ -1,56 +1,24 @@
 import tkinter as tk
 from tkinter import simpledialog, messagebox, Toplevel, Listbox, MULTIPLE
-from datetime import datetime
-from dateutil import parser
-import csv
 
 class RetrievePatient:
-    def __init__(self, master, data_path):
-        """Initialize with the parent window and data file path."""
+    def __init__(self, master, db):
+        """Initialize with the parent window and the shared HospitalDatabase."""
         self.master = master
-        self.data_path = data_path  
+        self.db = db
 
     def execute(self):
-        try:
-            with open(self.data_path, newline='', encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                db = list(reader)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to read data file: {e}")
-            return
-
         patient_id = simpledialog.askstring("Patient Lookup", "Enter Patient ID:", parent=self.master)
         if not patient_id:
             return
 
         patient_id = patient_id.strip()
-        visits = [entry for entry in db if entry.get("Patient_ID", "").strip() == patient_id]
-        if not visits:
+        # The patient's timeline is kept in date order, so the latest visit is just its last entry
+        most_recent_visit = self.db.get_latest_visit(patient_id)
+        if most_recent_visit is None:
             messagebox.showinfo("Not Found", f"Patient ID {patient_id} not found.")
             return
 
-        # Parse visit times safely and store paired with visit
-        parsed_visits = []
-        for visit in visits:
-            date_str = visit.get("Visit_time", "")
-            try:
-                dt = parser.parse(date_str)
-            except Exception:
-                dt = datetime.min  # fallback to very old date if parse fails
-            parsed_visits.append((dt, visit))
-
-        # Sort visits by datetime ascending (oldest first)
-        parsed_visits.sort(key=lambda x: x[0])
-
-        # Get the max datetime
-        max_dt = parsed_visits[-1][0]
-
-        # Filter all visits that happened exactly on that max date (date only)
-        max_date_visits = [v for dt, v in parsed_visits if dt.date() == max_dt.date()]
-
-        # Pick the last visit on that date (chronological order preserved by sorting)
-        most_recent_visit = max_date_visits[-1]
-
         self.show_fields(most_recent_visit)
 
     def show_fields(self, visit):
@@ -0,0 +1,158 @@
+import contextlib
+import csv
+import os
+import sqlite3
+import sys
+from csv_storage import VISIT_FIELDNAMES, file_signature
+
+DEFAULT_DB_NAME = "hospital.db"
+
+# Notes.csv has an unnamed index column; it is stored as note_index in SQLite
+NOTE_COLUMNS = ["note_index", "Patient_ID", "Visit_ID", "Note_ID", "Note_text"]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS patients (
+    Patient_ID TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS visits (
+    {", ".join(f'"{col}" TEXT' for col in VISIT_FIELDNAMES)},
+    FOREIGN KEY (Patient_ID) REFERENCES patients (Patient_ID) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS notes (
+    {", ".join(f'"{col}" TEXT' for col in NOTE_COLUMNS)},
+    FOREIGN KEY (Patient_ID) REFERENCES patients (Patient_ID) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_visits_patient ON visits (Patient_ID);
+CREATE INDEX IF NOT EXISTS idx_visits_visit ON visits (Visit_ID);
+CREATE INDEX IF NOT EXISTS idx_notes_patient ON notes (Patient_ID);
+CREATE INDEX IF NOT EXISTS idx_notes_visit ON notes (Visit_ID);
+CREATE INDEX IF NOT EXISTS idx_notes_note ON notes (Note_ID);
+"""
+
+
+class SqliteBackend:
+    """HospitalDatabase storage backend on an embedded SQLite file.
+
+    Inserts are single-row writes and deleting a patient is one DELETE that
+    cascades to the patient's visits and notes.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.data_dir = os.path.dirname(os.path.abspath(db_path))
+        self.deleted = {"Visit_ID": set(), "Note_ID": set()}  # Deletes are immediate, no tombstones
+        # Shared with worker threads; HospitalDatabase.lock serializes access
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+
+    def _visit_row(self, visit):
+        return [visit.get(col, "") for col in VISIT_FIELDNAMES]
+
+    def _note_row(self, note):
+        return [note.get("", "")] + [note.get(col, "") for col in NOTE_COLUMNS[1:]]
+
+    def signature(self):
+        # File-based (not PRAGMA data_version) so it stays comparable across restarts
+        return (file_signature(self.db_path), file_signature(self.db_path + "-wal"))
+
+    def load_visits(self):
+        cols = ", ".join(f'"{col}"' for col in VISIT_FIELDNAMES)
+        cursor = self.conn.execute(f"SELECT {cols} FROM visits ORDER BY rowid")
+        return [dict(zip(VISIT_FIELDNAMES, row)) for row in cursor]
+
+    def load_notes(self):
+        """Note IDs only; the text is fetched by read_note_text() when a note is shown."""
+        cols = ", ".join(f'"{col}"' for col in NOTE_COLUMNS[:-1])
+        cursor = self.conn.execute(f"SELECT {cols} FROM notes ORDER BY rowid")
+        keys = [""] + NOTE_COLUMNS[1:-1]
+        return [dict(zip(keys, row)) for row in cursor]
+
+    def read_note_text(self, note):
+        row = self.conn.execute(
+            "SELECT Note_text FROM notes WHERE Note_ID = ? AND Visit_ID = ? LIMIT 1",
+            (note.get("Note_ID"), note.get("Visit_ID")),
+        ).fetchone()
+        return row[0] if row else ""
+
+    def append(self, visits, notes):
+        """Insert new visits and notes in one transaction."""
+        self.insert_many(visits, notes)
+
+    def insert_many(self, visits, notes):
+        visit_sql = f"INSERT INTO visits VALUES ({', '.join('?' * len(VISIT_FIELDNAMES))})"
+        note_sql = f"INSERT INTO notes VALUES ({', '.join('?' * len(NOTE_COLUMNS))})"
+        with self.conn:
+            patient_ids = {row.get("Patient_ID", "") for row in visits} | {note.get("Patient_ID", "") for note in notes}
+            self.conn.executemany("INSERT OR IGNORE INTO patients VALUES (?)", [(pid,) for pid in patient_ids])
+            self.conn.executemany(visit_sql, (self._visit_row(row) for row in visits))
+            self.conn.executemany(note_sql, (self._note_row(note) for note in notes))
+
+    def delete_patients(self, removed_visits, removed_notes):
+        """Delete patients in one transaction; visits and notes go with them through ON DELETE CASCADE."""
+        patient_ids = {row.get("Patient_ID", "") for row in removed_visits}
+        patient_ids |= {note.get("Patient_ID", "") for note in removed_notes}
+        with self.conn:
+            self.conn.executemany("DELETE FROM patients WHERE Patient_ID = ?", [(pid,) for pid in patient_ids])
+
+    def locked(self):
+        return contextlib.nullcontext()  # SQLite serializes writers itself
+
+    def read_changes(self, include_notes=True):
+        return None  # No change feed; a stale database is simply reloaded
+
+    def needs_compaction(self, visits, notes):
+        return False  # Rows are already gone; VACUUM only reclaims space
+
+    def compact(self, visits=None, notes=None):
+        self.conn.execute("VACUUM")
+
+    def is_empty(self):
+        return self.conn.execute("SELECT COUNT(*) FROM patients").fetchone()[0] == 0
+
+
+def migrate_csv(data_path, notes_path, db_path, batch_size=10000):
+    """Bulk-import Patient_data.csv and Notes.csv into a new SQLite file; returns (visits, notes) counts."""
+    backend = SqliteBackend(db_path)
+    if not backend.is_empty():
+        raise ValueError(f"'{db_path}' already contains data; migration only runs once.")
+
+    counts = []
+    for path, is_visits in ((data_path, True), (notes_path, False)):
+        count = 0
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            while True:
+                batch = [row for _, row in zip(range(batch_size), reader)]
+                if not batch:
+                    break
+                if is_visits:
+                    backend.insert_many(batch, [])
+                else:
+                    backend.insert_many([], batch)
+                count += len(batch)
+        counts.append(count)
+
+    backend.conn.close()
+    return tuple(counts)
+
+
+if __name__ == "__main__":
+    # Usage: python sqlite_storage.py migrate [data_dir]
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("Usage: python sqlite_storage.py migrate [data_dir]")
+        sys.exit(1)
+
+    data_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    db_path = os.path.join(data_dir, DEFAULT_DB_NAME)
+    try:
+        visit_count, note_count = migrate_csv(
+            os.path.join(data_dir, "Patient_data.csv"),
+            os.path.join(data_dir, "Notes.csv"),
+            db_path,
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Imported {visit_count} visits and {note_count} notes into '{db_path}'.")
\ No newline at end of file
@@ -0,0 +1,112 @@
+import argparse
+import csv
+import os
+import random
+from csv_storage import VISIT_FIELDNAMES, NOTE_FIELDNAMES
+
+# Value pools taken from the sample data in data/
+DEPARTMENTS = ["Cardiology", "Emergency department", "Head and Neck", "Neorology", "Obstetrics and gynaecology",
+               "Pediatrics", "Psychiatry", "Radiology", "Surgery"]
+RACES = ["Asian", "Black", "Native Americans", "Pacific Islanders", "Unknown", "White"]
+GENDERS = ["Female", "Male", "Non-binary"]
+ETHNICITIES = ["Hispanic", "Non-Hispanic", "Other", "Unknown"]
+INSURANCES = ["Blueshield", "Medicaid", "Medicare", "Not Available", "Unknown"]
+COMPLAINTS = ["Unknown", "back pain", "bleeding", "chest pain", "fatigue", "infection", "injury"]
+NOTE_TYPES = ["admission note", "discharge note", "oncology note", "progress note", "social work note"]
+ROLES = ["admin", "clinician", "nurse", "management"]
+
+SENTENCES = [
+    "The patient presented with {complaint} that started several days before admission.",
+    "Vital signs on arrival were within normal limits apart from a mild tachycardia.",
+    "Physical examination revealed tenderness without guarding or rebound.",
+    "Laboratory tests showed a raised white cell count and C-reactive protein.",
+    "An ECG showed sinus rhythm with no acute ischaemic changes.",
+    "Imaging was performed and reviewed with the radiology team.",
+    "The patient was started on intravenous fluids and analgesia.",
+    "Empirical antibiotic therapy was commenced pending culture results.",
+    "The family was informed and agreed with the management plan.",
+    "Symptoms improved steadily over the following 48 hours.",
+    "The patient was reviewed by the {department} team on the ward round.",
+    "A follow-up appointment was arranged in the outpatient clinic.",
+    "Medication history included \"as needed\" analgesics and a daily antihypertensive.",
+    "There was no history of recent travel, trauma or similar illness in close contacts.",
+    "Discharge was planned once oral intake and mobility were adequate.",
+]
+ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+
+def make_note(rng, age, gender, complaint, department, note_bytes):
+    """A clinical-looking note of roughly note_bytes characters, spread over several paragraphs."""
+    parts = [f"A {age}-year-old {gender.lower()} patient was seen in {department}."]
+    size = len(parts[0])
+    while size < note_bytes:
+        sentence = rng.choice(SENTENCES).format(complaint=complaint, department=department)
+        if rng.random() < 0.15:
+            sentence += "\n"  # Multi-line records, as in the real Notes.csv
+        parts.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(parts)
+
+
+def generate(out_dir, visits, note_kb=2.0, users=50, seed=0):
+    """Write Patient_data.csv, Notes.csv and Credentials.csv with about `visits` visits to out_dir.
+
+    Rows are streamed to disk, so 10M-visit datasets do not need to fit in memory.
+    Each patient gets one to three visits with fixed demographics; IDs are unique.
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    note_bytes = int(note_kb * 1024)
+    patient_id = 100000
+    visit_id = 100000
+
+    with open(os.path.join(out_dir, "Patient_data.csv"), "w", newline="", encoding="utf-8") as visit_file, \
+            open(os.path.join(out_dir, "Notes.csv"), "w", newline="", encoding="utf-8") as note_file:
+        visit_writer = csv.writer(visit_file)
+        note_writer = csv.writer(note_file)
+        visit_writer.writerow(VISIT_FIELDNAMES)
+        note_writer.writerow(NOTE_FIELDNAMES)
+
+        written = 0
+        while written < visits:
+            patient_id += 1
+            race, gender, ethnicity = rng.choice(RACES), rng.choice(GENDERS), rng.choice(ETHNICITIES)
+            birth_year = rng.randint(1912, 2020)
+            zip_code = str(rng.randint(10000, 99999))
+            insurance = rng.choice(INSURANCES)
+            for _ in range(min(rng.randint(1, 3), visits - written)):
+                visit_id += 1
+                year = rng.randint(max(2000, birth_year), 2024)
+                month, day = rng.randint(1, 12), rng.randint(1, 28)
+                department, complaint = rng.choice(DEPARTMENTS), rng.choice(COMPLAINTS)
+                age = year - birth_year
+                visit_writer.writerow([patient_id, visit_id, f"{month}/{day}/{year}", department, race, gender,
+                                       ethnicity, age, zip_code, insurance, complaint, visit_id, rng.choice(NOTE_TYPES)])
+                note_writer.writerow([written, patient_id, visit_id, visit_id,
+                                      make_note(rng, age, gender, complaint, department, note_bytes)])
+                written += 1
+
+    with open(os.path.join(out_dir, "Credentials.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["", "username", "password", "role"])
+        for idx in range(users):
+            username = "".join(rng.choice(ALPHABET) for _ in range(7))
+            password = "".join(rng.choice(ALPHABET) for _ in range(7))
+            writer.writerow([idx, username, password, ROLES[idx % len(ROLES)]])
+
+    print(f"Wrote {visits} visits for {patient_id - 100000} patients and {users} users to '{out_dir}'.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic hospital data at a chosen scale.")
+    parser.add_argument("out_dir", help="Folder to write Patient_data.csv, Notes.csv and Credentials.csv to")
+    parser.add_argument("--visits", type=int, default=10000, help="Number of visits (and notes) to generate")
+    parser.add_argument("--note-kb", type=float, default=2.0, help="Approximate size of each note body in KB")
+    parser.add_argument("--users", type=int, default=50, help="Number of user accounts")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed, for reproducible datasets")
+    args = parser.parse_args(argv)
+    generate(args.out_dir, args.visits, args.note_kb, args.users, args.seed)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,122 @@
+import queue
+import tkinter as tk
+from tkinter import ttk, messagebox
+from concurrent.futures import ThreadPoolExecutor
+
+POLL_MS = 50  # How often the Tk loop checks for finished tasks
+
+
+class TaskRunner:
+    """Runs blocking disk work on worker threads and delivers results back on the Tk main loop.
+
+    Reads run on a small thread pool. Writes (write=True) go through a single
+    worker so they reach the files in the order they were submitted, and the
+    widgets registered with register_write_widgets() stay disabled while any
+    write is in flight. Callbacks always run on the Tk thread via root.after.
+    """
+
+    def __init__(self, root, max_workers=4):
+        self.root = root
+        self.read_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="io-read")
+        self.write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="io-write")
+        self.finished = queue.Queue()
+        self.in_flight = 0
+        self.writes_in_flight = 0
+        self.write_widgets = []
+        self.progress = None
+        self.status = None
+        self._polling = False
+
+    def attach_progress(self, parent):
+        """Create the busy indicator in a freshly built screen (shown only while tasks run)."""
+        self.status = ttk.Label(parent, text="")
+        self.progress = ttk.Progressbar(parent, mode="indeterminate", length=200)
+        self._update_progress("")
+
+    def register_write_widgets(self, widgets):
+        self.write_widgets = list(widgets)
+        self._set_state(self.write_widgets, "disabled" if self.writes_in_flight else "normal")
+
+    def submit(self, fn, *args, on_done=None, on_error=None, disable=(), message="Working...", write=False):
+        """Run fn(*args) off the Tk thread; on_done(result) or on_error(exception) run on it afterwards."""
+        disable = list(disable)
+        self.in_flight += 1
+        if write:
+            self.writes_in_flight += 1
+            disable += self.write_widgets
+        self._set_state(disable, "disabled")
+        self._update_progress(message)
+
+        pool = self.write_pool if write else self.read_pool
+        future = pool.submit(fn, *args)
+        future.add_done_callback(lambda f: self.finished.put((f, on_done, on_error, disable, write)))
+
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self._poll)
+        return future
+
+    def _poll(self):
+        try:
+            self._deliver_finished()
+        finally:
+            # Keep polling while tasks remain, even if delivering a result went wrong
+            if self.in_flight:
+                self.root.after(POLL_MS, self._poll)
+            else:
+                self._polling = False
+                self._update_progress("")
+
+    def _deliver_finished(self):
+        while True:
+            try:
+                future, on_done, on_error, disable, write = self.finished.get_nowait()
+            except queue.Empty:
+                break
+            self.in_flight -= 1
+            if write:
+                self.writes_in_flight -= 1
+            self._set_state([w for w in disable if w not in self.write_widgets or not self.writes_in_flight],
+                            "normal")
+
+            error = future.exception()
+            try:
+                if error is not None:
+                    if on_error:
+                        on_error(error)
+                    else:
+                        messagebox.showerror("Error", f"Operation failed: {error}")
+                elif on_done:
+                    on_done(future.result())
+            except Exception as e:
+                # A failing callback must not hold back the results queued after it
+                messagebox.showerror("Error", f"Operation failed: {e}")
+
+    def _set_state(self, widgets, state):
+        for widget in widgets:
+            try:
+                if widget.winfo_exists():
+                    widget.configure(state=state)
+            except tk.TclError:
+                pass  # Widget was destroyed while the task ran
+
+    def _update_progress(self, message):
+        try:
+            if not self.progress or not self.progress.winfo_exists():
+                return
+            if self.in_flight:
+                self.status.config(text=message)
+                self.status.pack(side="bottom")
+                self.progress.pack(side="bottom", pady=(0, 5))
+                self.progress.start(10)
+            else:
+                self.progress.stop()
+                self.progress.pack_forget()
+                self.status.pack_forget()
+        except tk.TclError:
+            pass
+
+    def shutdown(self):
+        """Let queued writes finish before the application exits."""
+        self.write_pool.shutdown(wait=True)
+        self.read_pool.shutdown(wait=False)
\ No newline at end of file
@@ -0,0 +1,16 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """A scratch copy of the sample data folder (only the CSV files)."""
+    for name in ("Patient_data.csv", "Notes.csv", "Credentials.csv"):
+        shutil.copy(os.path.join(REPO_DIR, "data", name), tmp_path / name)
+    return tmp_path
\ No newline at end of file
@@ -0,0 +1,23 @@
+from cohort_index import CohortIndex
+
+
+def visit(race, gender="Female"):
+    return {"Race": race, "Gender": gender}
+
+
+def test_rare_value_promoted_to_bitmap_keeps_earlier_rows():
+    index = CohortIndex([visit("White")] * 100 + [visit("Asian")])
+    assert index.count("Race=Asian") == 1
+    for _ in range(10):
+        index.add(visit("Asian"))
+    assert index.count("Race=Asian") == 11
+    assert index.count("NOT Race=Asian") == 100
+
+
+def test_counts_follow_adds_and_removals():
+    visits = [visit("White"), visit("Asian", "Male"), visit("Asian")]
+    index = CohortIndex(visits)
+    index.remove(visits[2])
+    index.add(visit("asian"))
+    assert index.count('race="Asian" AND Gender=Female') == 1
+    assert index.count("Race=Asian OR Race=White") == 3
\ No newline at end of file
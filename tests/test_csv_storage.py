@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from hospital_database import HospitalDatabase
+
+
+def open_db(data_dir):
+    return HospitalDatabase(csv_file=str(data_dir / "Patient_data.csv"), notes_file=str(data_dir / "Notes.csv"))
+
+
+def test_failed_compaction_keeps_deleted_records_hidden(data_dir):
+    db = open_db(data_dir)
+    patient_id = next(pid for pid, notes in db.patient_notes.items() if notes)
+    note_ids = {note["Note_ID"] for note in db.patient_notes[patient_id]}
+    visits_before = (data_dir / "Patient_data.csv").read_bytes()
+
+    os.mkdir(data_dir / "Notes.csv.tmp")  # The notes rewrite cannot create its temporary copy
+    db.remove_patient(patient_id)
+    with pytest.raises(OSError):
+        db.compact()
+
+    assert (data_dir / "Patient_data.csv").read_bytes() == visits_before  # Nothing replaced
+    assert (data_dir / "deleted_records.csv").exists()
+    reopened = open_db(data_dir)
+    assert not reopened.has_patient(patient_id)
+    assert not note_ids & set(reopened.note_index)
+
+    os.rmdir(data_dir / "Notes.csv.tmp")
+    reopened.compact()
+    assert not (data_dir / "deleted_records.csv").exists()
+    assert not note_ids & set(open_db(data_dir).note_index)
+
+
+def test_removal_reports_failed_compaction(data_dir):
+    db = open_db(data_dir)
+    patient_ids = list(db.patient_index)[: len(db.patient_index) // 2]  # Enough to trigger compaction
+    os.mkdir(data_dir / "Notes.csv.tmp")
+    with pytest.raises(OSError, match="compacting"):
+        db.remove_patients(patient_ids)
+
+    assert not any(db.has_patient(pid) for pid in patient_ids)
+    reopened = open_db(data_dir)
+    assert not any(reopened.has_patient(pid) for pid in patient_ids)
+    assert not any(note["Patient_ID"] in patient_ids for note in reopened.notes)
+
+
+def test_outside_edit_triggers_full_reload(data_dir):
+    db = open_db(data_dir)
+    db.load_notes()
+    first = db.data[0]
+    path = data_dir / "Patient_data.csv"
+    data = path.read_bytes()
+    path.write_bytes(data.replace(first["Visit_department"].encode(), b"Renamed outpatient department", 1))
+
+    assert db.refresh()
+    assert db.visit_index[first["Visit_ID"]]["Visit_department"] == "Renamed outpatient department"
+    assert len(db.data) == len(data.splitlines()) - 1
+    assert all(visit["Visit_ID"] and visit["Visit_time"] for visit in db.data)
+    db.get_columns()
+
+    note = db.notes[0]
+    path = data_dir / "Notes.csv"
+    path.write_bytes(path.read_bytes().replace(b"A 20-year-old", b"A twenty-year-old", 1))
+    assert db.refresh()
+    assert db.get_note_text(db.note_index[note["Note_ID"]]).startswith("A twenty-year-old")
+    assert len(db.notes) == len(open_db(data_dir).notes)
+
+
+def test_outside_append_is_merged_from_the_tail(data_dir):
+    db = open_db(data_dir)
+    other = open_db(data_dir)
+    visit = dict(db.data[0], Patient_ID="999999", Visit_ID="999999")
+    other.add_visit_record(visit)
+
+    assert db.refresh()
+    assert db.has_patient("999999")
+    assert len(db.data) == len(other.data)
+
+def test_reading_a_note_leaves_no_file_open(data_dir):
+    db = open_db(data_dir)
+    note = db.notes[0]
+    assert db.get_note_text(note)
+    assert db.backend.note_store._file is None
\ No newline at end of file
@@ -0,0 +1,43 @@
+import json
+import time
+
+from hospital_database import HospitalDatabase
+from id_allocator import IdAllocator, ALLOCATOR_NAME, FIRST_ID
+
+
+def open_db(data_dir):
+    return HospitalDatabase(csv_file=str(data_dir / "Patient_data.csv"), notes_file=str(data_dir / "Notes.csv"))
+
+
+def test_deleted_ids_are_not_reused(data_dir):
+    db = open_db(data_dir)
+    visit = db.data[-2]
+    patient_id, visit_id = visit["Patient_ID"], visit["Visit_ID"]
+    db.remove_patient(patient_id)
+    assert (data_dir / "deleted_records.csv").exists()  # Still a tombstone, not compacted away
+
+    # Put the high-water mark just below the deleted ID
+    (data_dir / ALLOCATOR_NAME).write_text(json.dumps({"Visit_ID": int(visit_id) - 5}))
+    db = open_db(data_dir)
+    ids = db.allocate_ids("Visit_ID", 3) + [db.allocate_ids("Visit_ID")[0] for _ in range(10)]
+    assert visit_id not in ids
+    assert int(max(ids)) > int(visit_id)
+
+    new_visit = dict(visit, Patient_ID="999999", Visit_ID=ids[-1])
+    db.add_visit_record(new_visit)
+    assert open_db(data_dir).has_patient("999999")
+
+
+def test_runs_of_used_ids_are_skipped_in_one_step():
+    used = {str(value) for value in range(FIRST_ID, FIRST_ID + 200000)}
+    allocator = IdAllocator(in_use=lambda kind, value: value in used)
+    writes = []
+    write_state = allocator._write_state
+    allocator._write_state = lambda state: writes.append(state) or write_state(state)
+
+    start = time.perf_counter()
+    first = allocator.allocate("Visit_ID")
+    assert time.perf_counter() - start < 1
+    assert first == str(FIRST_ID + 200000)
+    assert len(writes) == 1
+    assert allocator.reserve("Visit_ID", 3) == [str(FIRST_ID + 200000 + 20 + i) for i in range(3)]
\ No newline at end of file
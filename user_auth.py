@@ -1,9 +1,43 @@
 import csv
+import hashlib
+import hmac
+import os
+from csv_storage import file_signature
+
+# Permissions per role, built once at import instead of on every check
+ROLE_PERMISSIONS = {
+    "admin": frozenset(["count"]),
+    "clinician": frozenset(["add", "remove", "retrieve", "view", "search", "count"]),
+    "nurse": frozenset(["add", "remove", "retrieve", "view", "search", "count"]),
+    "management": frozenset(["statistics", "cohort", "user_log", "performance"]),
+}
+
+
+def hash_password(password, salt):
+    return hashlib.blake2b(password.encode("utf-8"), salt=salt, digest_size=32).digest()
+
+
+class Session:
+    """A logged-in user, carrying the role's permissions resolved once at login."""
+
+    __slots__ = ("username", "role", "permissions")
+
+    def __init__(self, username, role):
+        self.username = username
+        self.role = role
+        self.permissions = ROLE_PERMISSIONS.get(role, frozenset())
+
+    def can(self, mode):
+        return mode in self.permissions
+
 
 class UserAuth:
     def __init__(self, credentials_path):
         self.credentials_path = credentials_path
-        self.credentials = self.load_credentials()
+        self.credentials = {}  # username -> (salt, salted password hash, role)
+        self._signature = None
+        self._dummy_salt = os.urandom(16)
+        self.reload()
 
     def load_credentials(self):
         """Load credentials from a CSV file."""
@@ -14,19 +48,38 @@ class UserAuth:
             print(f"Error: The credentials file '{self.credentials_path}' was not found.")
             return []
 
+    def reload(self):
+        """Rebuild the username-keyed store; only salted hashes of the passwords are kept."""
+        self._signature = file_signature(self.credentials_path)
+        credentials = {}
+        for user in self.load_credentials():
+            salt = os.urandom(16)
+            credentials[user["username"]] = (salt, hash_password(user["password"], salt), user["role"])
+        self.credentials = credentials
+
+    def reload_if_changed(self):
+        """Pick up edits to the credentials file without restarting; returns True if it reloaded."""
+        if file_signature(self.credentials_path) != self._signature:
+            self.reload()
+            return True
+        return False
+
+    def start_session(self, username, password):
+        """Authenticate user and return a Session, or None if the credentials are invalid."""
+        self.reload_if_changed()
+        entry = self.credentials.get(username)
+        # Unknown users still pay for a hash and compare, so timing does not reveal valid usernames
+        salt, expected, role = entry if entry else (self._dummy_salt, b"", None)
+        if hmac.compare_digest(hash_password(password, salt), expected) and entry:
+            print(f"Login successful. Role: {role}")
+            return Session(username, role)
+        return None
+
     def login(self, username, password):
         """Authenticate user and return their role if credentials are valid."""
-        for user in self.credentials:
-            if user["username"] == username and user["password"] == password:
-                print(f"Login successful. Role: {user['role']}")
-                return user["role"]
-        return None
+        session = self.start_session(username, password)
+        return session.role if session else None
 
     def check_permission(self, role, mode):
         """Check if the given role can perform the requested mode."""
-        ROLE_PERMISSIONS = {
-            "admin": ["count"],
-            "clinician": ["add", "remove", "retrieve", "view", "count"],
-            "nurse": ["add", "remove", "retrieve", "view", "count"]
-        }
-        return mode in ROLE_PERMISSIONS.get(role, [])
\ No newline at end of file
+        return mode in ROLE_PERMISSIONS.get(role, ())
\ No newline at end of file
@@ -1,9 +1,161 @@
 import os
-import openpyxl
-from openpyxl import Workbook
+import csv
+import atexit
+import threading
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, messagebox
 from datetime import datetime
+from perf_metrics import timed
+
+LOG_HEADER = ["Username", "Role", "Action", "Timestamp"]
+FLUSH_INTERVAL = 2.0   # Seconds between background flushes
+FLUSH_BATCH = 50       # Flush early once this many actions are waiting
+PAGE_SIZE = 200        # Rows inserted into the log viewer per page
+
+
+class BufferedLogWriter:
+    """Appends action rows to a CSV log from a background thread.
+
+    track_action() only queues a row; the writer thread appends queued rows
+    every FLUSH_INTERVAL seconds (or sooner when FLUSH_BATCH are waiting).
+    flush() writes everything immediately and is called on logout and exit.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = []
+        self.pending_lock = threading.Lock()
+        self.file_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, row):
+        with self.pending_lock:
+            self.pending.append(row)
+            if len(self.pending) >= FLUSH_BATCH:
+                self.wake.set()
+
+    def _run(self):
+        while True:
+            self.wake.wait(FLUSH_INTERVAL)
+            self.wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self.file_lock:
+            with self.pending_lock:
+                rows, self.pending = self.pending, []
+            if not rows:
+                return
+            try:
+                with timed("Write audit log"):
+                    new_file = not os.path.exists(self.path)
+                    with open(self.path, "a", newline="", encoding="utf-8") as f:
+                        writer = csv.writer(f)
+                        if new_file:
+                            writer.writerow(LOG_HEADER)
+                        writer.writerows(rows)
+            except OSError as e:
+                print(f"Error writing user action log: {e}")
+
+
+# One writer per log file, shared by every tracker in the process
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_log_writer(path):
+    with _writers_lock:
+        if path not in _writers:
+            _writers[path] = BufferedLogWriter(path)
+        return _writers[path]
+
+
+def flush_all():
+    """Write out every queued action (logout / application exit)."""
+    for writer in list(_writers.values()):
+        writer.flush()
+
+
+atexit.register(flush_all)
+
+
+def timestamp_key(timestamp):
+    """Turn a logged 'MM-DD-YYYY HH:MM:SS' timestamp into a sortable 'YYYY-MM-DD HH:MM:SS' string."""
+    if len(timestamp) < 10:
+        return timestamp
+    return f"{timestamp[6:10]}-{timestamp[0:2]}-{timestamp[3:5]}{timestamp[10:]}"
+
+
+class ActionLogView:
+    """Filtered, sorted window onto the CSV action log that never holds the whole log in memory.
+
+    query() streams the file once and keeps only the byte offsets (plus a sort key)
+    of matching rows; page() then reads just the rows being displayed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets = []
+
+    def _iter_rows(self):
+        """Yield (byte offset, row) for every data row of the log."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.readline()  # Header
+            offset = f.tell()
+            for line in f:
+                row = next(csv.reader([line.decode("utf-8")]), None)
+                if row and len(row) >= 4:
+                    yield offset, row
+                offset += len(line)
+
+    def query(self, username="", role="", action="", start="", end="", sort_column=None, descending=False):
+        """Select matching rows; returns how many there are.
+
+        username and action match as case-insensitive substrings, role exactly;
+        start and end are 'YYYY-MM-DD[ HH:MM[:SS]]' bounds, both inclusive.
+        """
+        username, role, action = username.lower(), role.lower(), action.lower()
+        sort_index = LOG_HEADER.index(sort_column) if sort_column in LOG_HEADER else None
+
+        matches = []
+        for offset, row in self._iter_rows():
+            key = timestamp_key(row[3])
+            if username and username not in row[0].lower():
+                continue
+            if role and role != row[1].lower():
+                continue
+            if action and action not in row[2].lower():
+                continue
+            if start and key < start:
+                continue
+            if end and key[:len(end)] > end:
+                continue
+            if sort_index is None:
+                matches.append(offset)
+            else:
+                sort_key = key if sort_index == 3 else row[sort_index].lower()
+                matches.append((sort_key, offset))
+
+        if sort_index is None:
+            self.offsets = matches[::-1] if descending else matches
+        else:
+            matches.sort(reverse=descending)
+            self.offsets = [offset for _, offset in matches]
+        return len(self.offsets)
+
+    def page(self, start, count):
+        """Read rows start..start+count of the current query result."""
+        rows = []
+        with open(self.path, "rb") as f:
+            for offset in self.offsets[start:start + count]:
+                f.seek(offset)
+                rows.append(tuple(next(csv.reader([f.readline().decode("utf-8")]))))
+        return rows
+
 
 class UserActionTracker:
     def __init__(self, root):
@@ -12,58 +164,123 @@ class UserActionTracker:
         self.output_dir = f"User Statistics {today_str}"
         os.makedirs(self.output_dir, exist_ok=True)
 
-        # Fix formatting of the log file path
-        self.log_file = os.path.join(self.output_dir, f"user_statistics_{today_str}.xlsx")
-        
-        # Initialize log file if needed
-        self._initialize_log_file()
-
-    def _initialize_log_file(self):
-        """Create the Excel log file with headers if it doesn't already exist."""
-        if not os.path.exists(self.log_file):
-            wb = Workbook()
-            sheet = wb.active
-            sheet.title = "Actions"
-            sheet.append(["Username", "Role", "Action", "Timestamp"])
-            wb.save(self.log_file)
+        # Append-only action log; the Excel workbook is only produced by export_xlsx()
+        self.log_file = os.path.join(self.output_dir, f"user_statistics_{today_str}.csv")
+        self.xlsx_file = os.path.join(self.output_dir, f"user_statistics_{today_str}.xlsx")
+        self.writer = get_log_writer(self.log_file)
 
     def track_action(self, username, role, action):
-        """Record a user action in the Excel log."""
+        """Queue a user action for the log (written by the background writer)."""
         timestamp = datetime.now().strftime("%m-%d-%Y %H:%M:%S")
-        wb = openpyxl.load_workbook(self.log_file)
-        sheet = wb.active
-        sheet.append([username, role, action, timestamp])
-        wb.save(self.log_file)
+        self.writer.write([username, role, action, timestamp])
+
+    def flush(self):
+        """Write all queued actions to disk now."""
+        self.writer.flush()
 
     def get_action_log(self):
-        """Read all logged user actions from the Excel file."""
+        """Read all logged user actions from the CSV log."""
+        self.flush()
         log_entries = []
         if os.path.exists(self.log_file):
-            wb = openpyxl.load_workbook(self.log_file)
-            sheet = wb.active
-            for row in sheet.iter_rows(min_row=2, values_only=True):
-                log_entries.append(row)
+            with open(self.log_file, newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                next(reader, None)  # Header
+                for row in reader:
+                    log_entries.append(tuple(row))
         return log_entries
 
+    def export_xlsx(self):
+        """Write the day's log to an Excel workbook on demand; returns the workbook path."""
+        from openpyxl import Workbook
+
+        with timed("Export workbook"):
+            wb = Workbook(write_only=True)
+            sheet = wb.create_sheet("Actions")
+            sheet.append(LOG_HEADER)
+            for entry in self.get_action_log():
+                sheet.append(list(entry))
+            wb.save(self.xlsx_file)
+        return self.xlsx_file
+
     def display_action_table(self):
-        """Display the action log in a table using Tkinter Treeview."""
+        """Display the action log in a paged, filterable Treeview (rows load as you scroll)."""
+        self.flush()
+        view = ActionLogView(self.log_file)
+
         top = tk.Toplevel(self.root)
         top.title("User Action Log")
-        top.geometry("700x400")
+        top.geometry("760x460")
+
+        # Filters
+        filter_frame = ttk.Frame(top)
+        filter_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        filters = {}
+        for col, (label, name) in enumerate([("User:", "username"), ("Role:", "role"), ("Action:", "action"),
+                                             ("From (YYYY-MM-DD):", "start"), ("To:", "end")]):
+            ttk.Label(filter_frame, text=label).grid(row=0, column=col * 2, padx=2, sticky="e")
+            filters[name] = ttk.Entry(filter_frame, width=12)
+            filters[name].grid(row=0, column=col * 2 + 1, padx=2)
+
+        status = ttk.Label(top, text="")
+        status.pack(side="bottom", pady=(0, 5))
+
+        def export():
+            try:
+                path = self.export_xlsx()
+            except Exception as e:
+                messagebox.showerror("Export Failed", f"Could not export the log: {e}", parent=top)
+                return
+            messagebox.showinfo("Exported", f"Log exported to:\n\n{path}", parent=top)
+
+        ttk.Button(top, text="Export to Excel", command=export).pack(side="bottom", pady=5)
 
         # Treeview setup
-        tree = ttk.Treeview(top, columns=("Username", "Role", "Action", "Timestamp"), show="headings")
-        for col in ("Username", "Role", "Action", "Timestamp"):
-            tree.heading(col, text=col)
-            tree.column(col, width=160)
+        tree_frame = ttk.Frame(top)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        tree = ttk.Treeview(tree_frame, columns=LOG_HEADER, show="headings")
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        scrollbar.pack(side="right", fill="y")
+        tree.pack(side="left", fill=tk.BOTH, expand=True)
+
+        state = {"total": 0, "loaded": 0, "sort": None, "descending": False}
 
-        # Populate the Treeview
-        for entry in self.get_action_log():
-            tree.insert("", "end", values=entry)
+        def load_page():
+            rows = view.page(state["loaded"], PAGE_SIZE)
+            for entry in rows:
+                tree.insert("", "end", values=entry)
+            state["loaded"] += len(rows)
+            status.config(text=f"Showing {state['loaded']} of {state['total']} actions")
+
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            # Fetch the next page when the user nears the bottom of what is loaded
+            if float(last) > 0.9 and state["loaded"] < state["total"]:
+                load_page()
+
+        def refresh():
+            tree.delete(*tree.get_children())
+            state["total"] = view.query(
+                **{name: entry.get().strip() for name, entry in filters.items()},
+                sort_column=state["sort"], descending=state["descending"],
+            )
+            state["loaded"] = 0
+            load_page()
+
+        def sort_by(col):
+            if state["sort"] == col:
+                state["descending"] = not state["descending"]
+            else:
+                state["sort"], state["descending"] = col, False
+            refresh()
+
+        for col in LOG_HEADER:
+            tree.heading(col, text=col, command=lambda c=col: sort_by(c))
+            tree.column(col, width=160)
+        tree.configure(yscrollcommand=on_scroll)
 
-        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        ttk.Button(filter_frame, text="Apply", command=refresh).grid(row=0, column=10, padx=5)
+        for entry in filters.values():
+            entry.bind("<Return>", lambda event: refresh())
 
-        # Scrollbar for large logs
-        scrollbar = ttk.Scrollbar(top, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side="right", fill="y")
\ No newline at end of file
+        refresh()
\ No newline at end of file
@@ -1,7 +1,6 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog, scrolledtext
 from datetime import datetime
-import csv
 
 def center_toplevel(window):
     window.update_idletasks()
@@ -15,16 +14,9 @@ def center_toplevel(window):
 
 
 class ViewNotes:
-    def __init__(self, master, data_path, notes_path):
+    def __init__(self, master, db):
         self.master = master
-        self.data_path = data_path
-        self.notes_path = notes_path
-        self.patient_data = self.load_csv(self.data_path)
-        self.note_data = self.load_csv(self.notes_path)
-
-    def load_csv(self, path): 
-        with open(path, "r", encoding="utf-8") as f:
-            return list(csv.DictReader(f))
+        self.db = db
 
     def execute(self):
         patient_id = simpledialog.askstring("View Notes", "Enter Patient ID:", parent=self.master)
@@ -46,8 +38,8 @@ class ViewNotes:
         # Find matching Visit_IDs
         visit_ids = [
             visit["Visit_ID"]
-            for visit in self.patient_data
-            if visit.get("Patient_ID") == patient_id and visit.get("Visit_time") == formatted_date
+            for visit in self.db.get_patient(patient_id)
+            if visit.get("Visit_time") == formatted_date
         ]
 
         if not visit_ids:
@@ -56,9 +48,10 @@ class ViewNotes:
 
         # Find matching notes
         matching_notes = [
-            note.get("Note_text", "")
-            for note in self.note_data
-            if note.get("Patient_ID") == patient_id and note.get("Visit_ID") in visit_ids
+            self.db.get_note_text(note)
+            for visit_id in visit_ids
+            for note in self.db.get_notes_for_visit(visit_id)
+            if note.get("Patient_ID") == patient_id
         ]
 
         if not matching_notes:
@@ -78,4 +71,39 @@ class ViewNotes:
 
         text_area.config(state=tk.DISABLED)  # Make text read-only
 
-        center_toplevel(notes_window)
\ No newline at end of file
+        center_toplevel(notes_window)
+
+    def search(self):
+        query = simpledialog.askstring(
+            "Search Notes",
+            'Search note text (use "quotes" for phrases, word* for prefixes):',
+            parent=self.master,
+        )
+        if not query or not query.strip():
+            return
+
+        results = self.db.search_notes(query.strip())
+        if not results:
+            messagebox.showinfo("No Matches", f"No notes matched '{query}'.")
+            return
+
+        results_window = tk.Toplevel(self.master)
+        results_window.title(f"Note search: {query}")
+        results_window.geometry("600x450")
+
+        text_area = scrolledtext.ScrolledText(results_window, wrap=tk.WORD, font=("Arial", 11))
+        text_area.pack(expand=True, fill=tk.BOTH)
+
+        for rank, (note, score) in enumerate(results, 1):
+            visit = self.db.get_visit(note.get("Visit_ID")) or {}
+            text = self.db.get_note_text(note)
+            snippet = text[:300] + ("..." if len(text) > 300 else "")
+            text_area.insert(
+                tk.END,
+                f"{rank}. Patient {note.get('Patient_ID')} | Visit {visit.get('Visit_time', 'N/A')} "
+                f"| Note {note.get('Note_ID')} (score {score:.2f})\n{snippet}\n{'-'*40}\n",
+            )
+
+        text_area.config(state=tk.DISABLED)  # Make text read-only
+
+        center_toplevel(results_window)
\ No newline at end of file
@@ -0,0 +1,97 @@
+import json
+import os
+from collections import Counter
+from visit_dates import parse_visit_time
+
+AGGREGATES_NAME = "visit_aggregates.json"
+
+
+class VisitAggregates:
+    """Materialized visit counts per day, department, chief complaint and year.
+
+    Built once from the visit columns, then kept current in O(1) per visit by
+    add()/remove() and saved next to the data files. The saved copy is tagged
+    with the storage signature it matches, so it is only trusted while the data
+    files are unchanged.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.per_day = Counter()         # "YYYY-MM-DD" -> visits
+        self.per_department = Counter()  # Visit_department -> visits
+        self.per_complaint = Counter()   # Chief_complaint -> visits
+        self.per_year = Counter()        # year (int) -> visits
+
+    @classmethod
+    def from_columns(cls, columns, path=None):
+        """Build every table with vectorized counts over a VisitColumns."""
+        aggregates = cls(path)
+        for date_str in columns.invalid_dates:
+            print(f"Skipping invalid date: {date_str}")
+        aggregates.per_day.update(columns.counts_by_day())
+        aggregates.per_department.update(columns.department_counts())
+        aggregates.per_complaint.update(columns.complaint_counts())
+        aggregates.per_year.update(columns.counts_by_year())
+        return aggregates
+
+    @classmethod
+    def load(cls, path, signature):
+        """Read saved tables, or return None if missing or saved for a different version of the data."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if saved.get("signature") != json.loads(json.dumps(signature)):
+            return None
+
+        aggregates = cls(path)
+        aggregates.per_day.update(saved["per_day"])
+        aggregates.per_department.update(saved["per_department"])
+        aggregates.per_complaint.update(saved["per_complaint"])
+        aggregates.per_year.update({int(year): n for year, n in saved["per_year"].items()})
+        return aggregates
+
+    def save(self, signature):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "signature": signature,
+                    "per_day": self.per_day,
+                    "per_department": self.per_department,
+                    "per_complaint": self.per_complaint,
+                    "per_year": {str(year): n for year, n in self.per_year.items()},
+                }, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving visit aggregates: {e}")
+
+    def _apply(self, visit, delta):
+        visit_date = parse_visit_time(visit.get("Visit_time", "").strip())
+        if visit_date:
+            self._bump(self.per_day, visit_date.isoformat(), delta)
+            self._bump(self.per_year, visit_date.year, delta)
+        department = visit.get("Visit_department", "Unknown").strip()
+        if department:
+            self._bump(self.per_department, department, delta)
+        complaint = visit.get("Chief_complaint", "").strip()
+        if complaint:
+            self._bump(self.per_complaint, complaint, delta)
+
+    def _bump(self, table, key, delta):
+        table[key] += delta
+        if table[key] <= 0:
+            del table[key]
+
+    def add(self, visit):
+        self._apply(visit, 1)
+
+    def remove(self, visit):
+        self._apply(visit, -1)
+
+    def count_on(self, day):
+        """Number of visits on a datetime.date."""
+        return self.per_day.get(day.isoformat(), 0)
\ No newline at end of file
@@ -0,0 +1,59 @@
+from collections.abc import Mapping
+import numpy as np
+from visit_dates import parse_visit_time
+
+
+def encode_categorical(values):
+    """Dictionary-encode strings: returns (labels in first-seen order, int32 code per value)."""
+    lookup = {}
+    codes = np.fromiter((lookup.setdefault(v, len(lookup)) for v in values), dtype=np.int32, count=len(values))
+    return list(lookup), codes
+
+
+class VisitColumns:
+    """Visit records converted once into typed columns so group-by counts run vectorized.
+
+    visit_date is a datetime64[D] array (NaT where Visit_time could not be parsed);
+    department and complaint are integer codes into department_labels / complaint_labels.
+    Each distinct Visit_time string is parsed only once, however many visits share it.
+    """
+
+    def __init__(self, visit_records):
+        visits = [r for r in visit_records if isinstance(r, Mapping)]
+        self.size = len(visits)
+
+        date_labels, date_codes = encode_categorical([v.get("Visit_time", "").strip() for v in visits])
+        parsed = [parse_visit_time(s) if s else None for s in date_labels]
+        label_dates = np.array([np.datetime64(d, "D") if d else np.datetime64("NaT", "D") for d in parsed],
+                               dtype="datetime64[D]")
+        self.visit_date = label_dates[date_codes] if self.size else np.array([], dtype="datetime64[D]")
+        self.invalid_dates = [s for s, d in zip(date_labels, parsed) if s and d is None]
+
+        self.department_labels, self.department = encode_categorical(
+            [v.get("Visit_department", "Unknown").strip() for v in visits])
+        self.complaint_labels, self.complaint = encode_categorical(
+            [v.get("Chief_complaint", "").strip() for v in visits])
+
+    def count_on(self, day):
+        """Number of visits on a datetime.date."""
+        return int(np.count_nonzero(self.visit_date == np.datetime64(day, "D")))
+
+    def counts_by_day(self):
+        """Visits per day as {"YYYY-MM-DD": count}."""
+        days, counts = np.unique(self.visit_date[~np.isnat(self.visit_date)], return_counts=True)
+        return {str(d): int(c) for d, c in zip(days, counts)}
+
+    def counts_by_year(self):
+        valid = self.visit_date[~np.isnat(self.visit_date)]
+        years, counts = np.unique(valid.astype("datetime64[Y]").astype(np.int64) + 1970, return_counts=True)
+        return {int(y): int(c) for y, c in zip(years, counts)}
+
+    def _category_counts(self, labels, codes):
+        counts = np.bincount(codes, minlength=len(labels))
+        return {label: int(n) for label, n in zip(labels, counts) if label and n}
+
+    def department_counts(self):
+        return self._category_counts(self.department_labels, self.department)
+
+    def complaint_counts(self):
+        return self._category_counts(self.complaint_labels, self.complaint)
\ No newline at end of file
@@ -0,0 +1,25 @@
+from datetime import datetime
+from functools import lru_cache
+
+VISIT_TIME_FORMATS = ("%m/%d/%Y", "%m/%d/%Y %H:%M:%S")
+
+
+def parse_visit_time(date_str):
+    """Parse one Visit_time string to a date, or None if it is not a recognizable date."""
+    for fmt in VISIT_TIME_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            pass
+    try:
+        from dateutil import parser
+        return parser.parse(date_str).date()
+    except (ValueError, OverflowError, ImportError):
+        return None
+
+
+@lru_cache(maxsize=None)
+def visit_ordinal(date_str):
+    """Day number (date.toordinal) of a Visit_time string, or None; each distinct string is parsed once."""
+    parsed = parse_visit_time(date_str.strip()) if date_str else None
+    return parsed.toordinal() if parsed else None
\ No newline at end of file
@@ -0,0 +1,128 @@
+from bisect import bisect_left, bisect_right
+from datetime import date
+from visit_dates import visit_ordinal
+
+ALL = ("all",)
+PERIODS = ("day", "week", "month", "quarter", "year")
+
+
+def period_label(day, period):
+    """Bucket name of a date for a grouping period, e.g. '2024-W05', '2024-01' or '2024-Q1'."""
+    if period == "day":
+        return day.isoformat()
+    if period == "week":
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    if period == "month":
+        return f"{day.year}-{day.month:02d}"
+    if period == "quarter":
+        return f"{day.year}-Q{(day.month - 1) // 3 + 1}"
+    if period == "year":
+        return str(day.year)
+    raise ValueError(f"Unknown period '{period}'; use one of {', '.join(PERIODS)}")
+
+
+class VisitQueryEngine:
+    """Date-range queries over visits, optionally filtered by department and/or chief complaint.
+
+    For every filter combination (all visits, each department, each complaint,
+    each department+complaint pair) the engine keeps the visits sorted by date
+    next to a parallel list of date ordinals. A query picks the matching list
+    and finds the range with two binary searches, so counts are O(log n) and
+    listings O(log n + matches). add()/remove() keep the lists sorted.
+    """
+
+    def __init__(self, visits=()):
+        self.ordinals = {}  # filter key -> sorted date ordinals
+        self.visits = {}    # filter key -> visits in the same order
+        self.invalid = 0    # visits without a parseable Visit_time (never matched)
+
+        entries = []
+        for visit in visits:
+            ordinal = self._ordinal(visit)
+            if ordinal is None:
+                self.invalid += 1
+                continue
+            entries.append((ordinal, visit))
+        entries.sort(key=lambda entry: entry[0])  # Stable, so file order is kept within a day
+        for ordinal, visit in entries:
+            for key in self._keys(visit):
+                self.ordinals.setdefault(key, []).append(ordinal)
+                self.visits.setdefault(key, []).append(visit)
+
+    def _ordinal(self, visit):
+        return visit_ordinal(visit.get("Visit_time", ""))
+
+    @staticmethod
+    def _keys(visit):
+        department = visit.get("Visit_department", "Unknown").strip()
+        complaint = visit.get("Chief_complaint", "").strip()
+        return (ALL, ("department", department), ("complaint", complaint), ("both", department, complaint))
+
+    @staticmethod
+    def _key(department=None, complaint=None):
+        if department and complaint:
+            return ("both", department, complaint)
+        if department:
+            return ("department", department)
+        if complaint:
+            return ("complaint", complaint)
+        return ALL
+
+    def add(self, visit):
+        ordinal = self._ordinal(visit)
+        if ordinal is None:
+            self.invalid += 1
+            return
+        for key in self._keys(visit):
+            ordinals = self.ordinals.setdefault(key, [])
+            index = bisect_right(ordinals, ordinal)
+            ordinals.insert(index, ordinal)
+            self.visits.setdefault(key, []).insert(index, visit)
+
+    def remove(self, visit):
+        ordinal = self._ordinal(visit)
+        if ordinal is None:
+            self.invalid = max(0, self.invalid - 1)
+            return
+        for key in self._keys(visit):
+            ordinals, visits = self.ordinals.get(key, []), self.visits.get(key, [])
+            for index in range(bisect_left(ordinals, ordinal), bisect_right(ordinals, ordinal)):
+                if visits[index] is visit:
+                    del ordinals[index]
+                    del visits[index]
+                    break
+
+    def _range(self, start, end, department, complaint):
+        key = self._key(department, complaint)
+        ordinals = self.ordinals.get(key, [])
+        lo = bisect_left(ordinals, start.toordinal()) if start else 0
+        hi = bisect_right(ordinals, end.toordinal()) if end else len(ordinals)
+        return key, lo, max(lo, hi)
+
+    def count(self, start=None, end=None, department=None, complaint=None):
+        """Number of visits with start <= date <= end (datetime.date bounds, None = open)."""
+        _, lo, hi = self._range(start, end, department, complaint)
+        return hi - lo
+
+    def find(self, start=None, end=None, department=None, complaint=None):
+        """The matching visits in date order."""
+        key, lo, hi = self._range(start, end, department, complaint)
+        return self.visits.get(key, [])[lo:hi]
+
+    def count_by(self, period, start=None, end=None, department=None, complaint=None):
+        """Matching visits per day/week/month/quarter/year, as [(label, count)] in date order."""
+        key, lo, hi = self._range(start, end, department, complaint)
+        counts = {}
+        last_ordinal, last_label = None, None
+        for ordinal in self.ordinals.get(key, [])[lo:hi]:
+            if ordinal != last_ordinal:  # Sorted, so each day's label is computed once
+                last_ordinal, last_label = ordinal, period_label(date.fromordinal(ordinal), period)
+            counts[last_label] = counts.get(last_label, 0) + 1
+        return list(counts.items())
+
+    def departments(self):
+        return sorted(key[1] for key in self.ordinals if key[0] == "department" and self.ordinals[key])
+
+    def complaints(self):
+        return sorted(key[1] for key in self.ordinals if key[0] == "complaint" and self.ordinals[key])
\ No newline at end of file
@@ -0,0 +1,127 @@
+from collections import deque
+from collections.abc import Mapping
+from itertools import repeat
+from operator import attrgetter
+
+VISIT_FIELDNAMES = [
+    "Patient_ID", "Visit_ID", "Visit_time", "Visit_department", "Race", "Gender", "Ethnicity",
+    "Age", "Zip_code", "Insurance", "Chief_complaint", "Note_ID", "Note_type",
+]
+ID_FIELDS = ("Patient_ID", "Visit_ID", "Note_ID")
+SHARED_FIELDS = tuple(field for field in VISIT_FIELDNAMES if field not in ID_FIELDS)
+FIELD_SET = frozenset(VISIT_FIELDNAMES)
+
+_shared = {}  # One string object per distinct categorical value, shared by every record
+
+
+class _Missing:
+    """Slot value for a field the source row did not have (a class, so it pickles by reference)."""
+
+
+class VisitRecord(Mapping):
+    """A visit row stored compactly, read like the csv.DictReader dict it replaces.
+
+    Fields are slots instead of a per-row dict, numeric IDs are kept as ints
+    (handed out as strings, as before) and categorical values such as
+    department, race or insurance are one shared string per distinct value.
+    Records are read-only: get(), [], in, keys(), items(), dict(record) and
+    csv.DictWriter all work as they did on dicts.
+    """
+
+    __slots__ = tuple(VISIT_FIELDNAMES) + ("_extra",)
+
+    def __init__(self, row):
+        present = 0
+        for field in ID_FIELDS:
+            value = row.get(field, _Missing)
+            if type(value) is str and value.isascii() and value.isdigit() and (value == "0" or value[0] != "0"):
+                value = int(value)  # Only when str(int(value)) gives the same text back
+            setattr(self, field, value)
+            present += value is not _Missing
+        shared = _shared
+        for field in SHARED_FIELDS:
+            value = row.get(field, _Missing)
+            if type(value) is str:
+                value = shared.setdefault(value, value)
+            setattr(self, field, value)
+            present += value is not _Missing
+        self._extra = None  # Columns beyond the standard ones, if the file has any
+        if len(row) != present:
+            self._extra = {key: value for key, value in row.items() if key not in FIELD_SET} or None
+
+    @classmethod
+    def of(cls, row):
+        return row if type(row) is cls else cls(row)
+
+    def __getitem__(self, key):
+        if key in FIELD_SET:
+            value = getattr(self, key)
+            if value is _Missing:
+                raise KeyError(key)
+            return str(value) if type(value) is int else value
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in FIELD_SET:
+            value = getattr(self, key)
+            if value is _Missing:
+                return default
+            return str(value) if type(value) is int else value
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        return default
+
+    def __contains__(self, key):
+        if key in FIELD_SET:
+            return getattr(self, key) is not _Missing
+        return bool(self._extra) and key in self._extra
+
+    def __iter__(self):
+        for field in VISIT_FIELDNAMES:
+            if getattr(self, field) is not _Missing:
+                yield field
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"VisitRecord({dict(self)!r})"
+
+    def __reduce__(self):
+        return _restore, (_slot_values(self), self._extra)
+
+
+_slot_values = attrgetter(*VISIT_FIELDNAMES)
+
+
+def _restore(values, extra):
+    record = VisitRecord.__new__(VisitRecord)
+    for field, value in zip(VISIT_FIELDNAMES, values):
+        setattr(record, field, value)
+    record._extra = extra
+    return record
+
+
+_SLOTS = [VisitRecord.__dict__[name] for name in VisitRecord.__slots__]
+
+
+def to_columns(records):
+    """Records as one list per field, for the snapshot: pickles much faster than record by record."""
+    return [list(map(slot.__get__, records)) for slot in _SLOTS]
+
+
+def from_columns(columns):
+    """Inverse of to_columns(); the per-record loops run inside map() rather than in Python code."""
+    records = list(map(VisitRecord.__new__, repeat(VisitRecord, len(columns[0]))))
+    for slot, values in zip(_SLOTS, columns):
+        deque(map(slot.__set__, records, values), maxlen=0)
+    return records
+
+
+def compact_visits(rows):
+    """Visit rows as VisitRecords (rows that already are one are kept as they are)."""
+    return [VisitRecord.of(row) for row in rows]
\ No newline at end of file